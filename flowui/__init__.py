@@ -27,10 +27,17 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from flowui.lazy import attach
 from flowui.version import VERSION, __version__
-from flowui.widget import Widget
-import flowui.widgets
-from flowui.theme import Theme
-import flowui.themes
-from flowui.terminal import Terminal
-from flowui.terminal import AnsiTerminal
+
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    'AnsiTerminal': 'flowui.terminal',
+    'Instrumentation': 'flowui.instrument',
+    'RenderCache': 'flowui.cache',
+    'Terminal': 'flowui.terminal',
+    'Theme': 'flowui.theme',
+    'Widget': 'flowui.widget',
+    'terminals': None,
+    'themes': None,
+    'widgets': None})
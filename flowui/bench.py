@@ -0,0 +1,434 @@
+# FlowUI benchmarks
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from flowui.terminal import AnsiTerminal
+from flowui.terminal import Terminal
+from flowui.terminals import SysTerminal
+from flowui.themes import Solarized
+from flowui.themes import Zenburn
+from flowui.version import __version__
+from flowui.widgets import Section
+from flowui.widgets import table
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+_WORDS = ('flow', 'register', 'address', 'stack', 'frame', 'symbol',
+          'breakpoint', 'instruction', 'memory', 'thread', 'value', 'x')
+
+_IMPORT = ('import time\n'
+           'start = time.time()\n'
+           'import %s\n'
+           'print(time.time() - start)\n')
+
+
+class NullTerminal(Terminal):
+    '''Terminal discarding all output
+
+    Only counts the number of characters written so that the benchmarks
+    measure FlowUI rather than the output device.
+
+    '''
+    def __init__(self, width=Terminal.DEFAULT_WIDTH,
+                 height=Terminal.DEFAULT_HEIGHT, depth=256):
+        super(NullTerminal, self).__init__(width, height, depth)
+        self.written = 0
+
+    def write(self, string, dictionary=None):
+        if dictionary is not None:
+            string = string % dictionary
+        self.written += len(string)
+
+
+class Benchmark(object):
+    '''A synthetic workload
+
+    Only the run callable is timed. It is passed the value returned by the
+    optional setup callable which is called before every run. A run which
+    measures itself, i.e. in a separate process, returns the elapsed time in
+    seconds.
+
+    '''
+    def __init__(self, name, run, setup=None, items=1, unit='ops',
+                 memory=True):
+        '''
+        Keyword arguments:
+        name -- unique name of the benchmark
+        run -- callable performing one iteration of the workload
+        setup -- optional callable preparing the argument of run
+        items -- number of items, i.e. rows or calls, processed per run
+        unit -- name of the items used when reporting throughput
+        memory -- whether the peak memory usage of a run is measured
+
+        '''
+        self.name = name
+        self._run = run
+        self._setup = setup
+        self.items = items
+        self.unit = unit
+        self.memory = memory
+
+    def _argument(self):
+        if self._setup is None:
+            return None
+        return self._setup()
+
+    def time(self):
+        '''Run the workload once and return the elapsed time in seconds'''
+        argument = self._argument()
+        start = _timer()
+        elapsed = self._run(argument)
+        if elapsed is None:
+            elapsed = _timer() - start
+        return elapsed
+
+    def peak_memory(self):
+        '''Run the workload once and return the peak memory allocated in
+        bytes, or None if it can not be measured'''
+        if tracemalloc is None or not self.memory:
+            return None
+
+        argument = self._argument()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            self._run(argument)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def _contents(rng, words):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _table_rows(rows, columns, wrap, width):
+    '''Generate cell contents where the wrap ratio of the cells are too wide
+    to fit their share of the width'''
+    rng = random.Random(rows * columns)
+    share = int(width / columns)
+    long_words = max(2, int(share / 3))
+    data = []
+    for i in range(rows):
+        row = []
+        for j in range(columns):
+            if rng.random() < wrap:
+                row.append(_contents(rng, long_words))
+            else:
+                row.append('%(face-identifier)s' + _contents(rng, 1) +
+                           '%(face-normal)s ' + str(i * columns + j))
+        data.append(row)
+    return data
+
+
+def _build_table(data, retain=False):
+    tbl = table.Table(retain=retain)
+    for contents in data:
+        row = table.Row()
+        for cell in contents:
+            row.add_cell(table.Cell(cell))
+        tbl.add_row(row)
+    return tbl
+
+
+def _table_benchmark(terminal, rows, columns, wrap):
+    data = _table_rows(rows, columns, wrap, terminal.width())
+
+    def run(tbl):
+        tbl.draw(terminal, terminal.width())
+
+    return Benchmark('table/%dx%d/wrap%d' % (rows, columns, wrap * 100),
+                     run, lambda: _build_table(data), rows, 'rows')
+
+
+def _redraw_benchmark(terminal, rows, columns):
+    data = _table_rows(rows, columns, 0, terminal.width())
+    section = Section('redraw')
+    tbl = _build_table(data, True)
+    section.add_component(tbl)
+    counter = [0]
+
+    def setup():
+        counter[0] += 1
+        row = tbl._rows[counter[0] % rows]
+        row.cells()[0].set_contents(data[counter[0] % rows][0])
+
+    def run(_):
+        section.draw(terminal, terminal.width())
+
+    section.draw(terminal, terminal.width())
+    return Benchmark('table/%dx%d/redraw' % (rows, columns), run, setup, 1,
+                     'redraws')
+
+
+def _cell_benchmark(terminal, length):
+    contents = _contents(random.Random(length), int(length / 6))
+
+    def run(cell):
+        for line in cell.lines(terminal, terminal.width()):
+            terminal.write('%s\n' % line)
+
+    return Benchmark('cell/%d' % length, run, lambda: table.Cell(contents),
+                     length, 'chars')
+
+
+def _terminal_benchmarks(terminal, count):
+    rng = random.Random(count)
+    strings = ['%%(face-statement)s%s%%(face-normal)s %s %%(face-constant)s%d'
+               '%%(face-normal)s\n' % (_contents(rng, 2), _contents(rng, 4),
+                                       i)
+               for i in range(count)]
+
+    def write(_):
+        for string in strings:
+            terminal.write(string)
+
+    def length(_):
+        for string in strings:
+            terminal.len(string)
+
+    return [Benchmark('ansi/write', write, items=count, unit='writes'),
+            Benchmark('ansi/len', length, items=count, unit='calls')]
+
+
+def _construction_benchmarks():
+    null = NullTerminal()
+
+    def solarized(_):
+        AnsiTerminal(null, Solarized())
+
+    def zenburn(_):
+        AnsiTerminal(null, Zenburn())
+
+    def systerminal(_):
+        SysTerminal()
+
+    environment = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment['PYTHONPATH'] = os.pathsep.join(
+        [root] + [x for x in [os.environ.get('PYTHONPATH')] if x])
+
+    def imports(modules):
+        def run(_):
+            output = subprocess.check_output(
+                [sys.executable, '-c', _IMPORT % modules], env=environment)
+            return float(output.decode('ascii'))
+        return run
+
+    return [Benchmark('theme/solarized', solarized),
+            Benchmark('theme/zenburn', zenburn),
+            Benchmark('systerminal/init', systerminal),
+            Benchmark('import', imports('flowui.terminal, '
+                                        'flowui.widgets.table'),
+                      memory=False),
+            Benchmark('import/flowui', imports('flowui'), memory=False)]
+
+
+def benchmarks(quick=False):
+    '''Create the list of benchmarks
+
+    Keyword arguments:
+    quick -- only use the smaller workloads
+
+    '''
+    terminal = AnsiTerminal(NullTerminal(120), Solarized())
+    sizes = quick and (100, 1000) or (100, 1000, 10000)
+    result = []
+    for rows in sizes:
+        for columns in (4, 16):
+            for wrap in (0, 0.25):
+                result.append(_table_benchmark(terminal, rows, columns, wrap))
+    result.append(_redraw_benchmark(terminal, sizes[-1], 4))
+    for length in (quick and (10000,) or (10000, 1000000)):
+        result.append(_cell_benchmark(terminal, length))
+    result.extend(_terminal_benchmarks(terminal, 1000))
+    result.extend(_construction_benchmarks())
+    return result
+
+
+def _percentile(values, percent):
+    '''Get the percentile of the sorted values using linear interpolation'''
+    position = (len(values) - 1) * percent / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def measure(benchmark, repeat=20, min_time=1.0):
+    '''Measure a benchmark
+
+    Runs the workload once as warm up and then until it has been repeated the
+    specified number of times or for at least min_time seconds, but at least
+    three times.
+
+    Returns a dictionary with the latency statistics in seconds, the
+    throughput in items per second and the peak memory usage in bytes.
+
+    '''
+    gc.collect()
+    benchmark.time()
+    times = []
+    start = _timer()
+    while len(times) < 3 or (len(times) < repeat and
+                             _timer() - start < min_time):
+        times.append(benchmark.time())
+    times.sort()
+
+    mean = sum(times) / len(times)
+    return {'iterations': len(times),
+            'min': times[0],
+            'mean': mean,
+            'p50': _percentile(times, 50),
+            'p90': _percentile(times, 90),
+            'p99': _percentile(times, 99),
+            'throughput': mean and benchmark.items / mean or None,
+            'unit': benchmark.unit,
+            'peak_memory': benchmark.peak_memory()}
+
+
+def compare(results, baseline, threshold=0.1):
+    '''Compare results with a baseline
+
+    Returns a list of (name, baseline, current, ratio, regressed) tuples for
+    every benchmark found in both, where baseline and current are the median
+    latencies and regressed is true if the median grew by more than the
+    threshold fraction.
+
+    '''
+    comparison = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        before = baseline[name]['p50']
+        after = results[name]['p50']
+        ratio = before and after / before or 1.0
+        comparison.append((name, before, after, ratio,
+                           1.0 + threshold < ratio))
+    return comparison
+
+
+def _report(name, result, stream):
+    memory = '-'
+    if result['peak_memory'] is not None:
+        memory = '%.1f' % (result['peak_memory'] / 1024.0)
+    throughput = '-'
+    if result['throughput'] is not None:
+        throughput = '%.0f %s/s' % (result['throughput'], result['unit'])
+    stream.write('%-24s %5d %10.3f %10.3f %10.3f %10s %22s\n' %
+                 (name, result['iterations'], result['p50'] * 1000,
+                  result['p90'] * 1000, result['p99'] * 1000, memory,
+                  throughput))
+
+
+def main(argv=None, stream=sys.stdout):
+    '''Run the benchmarks from the command line
+
+    Returns the exit status, which is non-zero if any benchmark regressed
+    compared to the baseline.
+
+    '''
+    parser = argparse.ArgumentParser(prog='python -m flowui.bench',
+                                     description='Benchmark FlowUI.')
+    parser.add_argument('-k', '--filter', default=None,
+                        help='only run benchmarks matching the expression')
+    parser.add_argument('-q', '--quick', action='store_true',
+                        help='only run the smaller workloads')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='list the benchmarks and exit')
+    parser.add_argument('-n', '--repeat', type=int, default=20,
+                        help='maximum number of runs of each benchmark')
+    parser.add_argument('-t', '--time', type=float, default=1.0,
+                        help='minimum time in seconds to run each benchmark')
+    parser.add_argument('-o', '--output', default=None,
+                        help='save the results as JSON')
+    parser.add_argument('-b', '--baseline', default=None,
+                        help='compare the results to saved JSON results')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='fraction by which the median latency may grow '
+                        'before it is reported as a regression')
+    options = parser.parse_args(argv)
+
+    selected = benchmarks(options.quick)
+    if options.filter:
+        expression = re.compile(options.filter)
+        selected = [x for x in selected if expression.search(x.name)]
+    if options.list:
+        for benchmark in selected:
+            stream.write('%s\n' % benchmark.name)
+        return 0
+
+    stream.write('%-24s %5s %10s %10s %10s %10s %22s\n' %
+                 ('benchmark', 'runs', 'p50 ms', 'p90 ms', 'p99 ms',
+                  'peak KiB', 'throughput'))
+    results = {}
+    for benchmark in selected:
+        results[benchmark.name] = measure(benchmark, options.repeat,
+                                          options.time)
+        _report(benchmark.name, results[benchmark.name], stream)
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump({'flowui': __version__,
+                       'python': platform.python_version(),
+                       'results': results}, output, indent=2, sort_keys=True)
+
+    status = 0
+    if options.baseline:
+        with open(options.baseline) as baseline:
+            baseline = json.load(baseline)
+        comparison = compare(results, baseline['results'], options.threshold)
+        if baseline.get('python') != platform.python_version():
+            stream.write('\nbaseline was measured with Python %s\n' %
+                         baseline.get('python'))
+        stream.write('\n%-24s %10s %10s %8s\n' %
+                     ('benchmark', 'base ms', 'p50 ms', 'change'))
+        for name, before, after, ratio, regressed in comparison:
+            stream.write('%-24s %10.3f %10.3f %+7.1f%%%s\n' %
+                         (name, before * 1000, after * 1000,
+                          (ratio - 1) * 100, regressed and ' REGRESSED' or ''))
+            if regressed:
+                status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
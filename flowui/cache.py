@@ -0,0 +1,90 @@
+# FlowUI render cache
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from flowui.template import LRUCache
+
+
+class RenderCache(object):
+    '''Cache of formatted widget output
+
+    Stores the formatted output of widgets drawn through the cache keyed by
+    the widget, its version, the width and how the terminal formats output,
+    i.e. theme and color depth. Drawing a widget which is found in the cache
+    replays the stored output without drawing the widget. The least recently
+    used output is evicted when the cache is full.
+
+    Output can only be recorded from terminals providing record, replay and
+    format_key, such as AnsiTerminal, other terminals are drawn on directly.
+    So are widgets which keep their own output, see Widget.retains, and
+    widgets which don't track their modifications, see Widget.tracked, since
+    their version doesn't change when they are modified.
+
+    '''
+    DEFAULT_SIZE = 128
+
+    def __init__(self, size=DEFAULT_SIZE):
+        '''
+        Keyword arguments:
+        size -- maximum number of outputs kept in the cache
+
+        '''
+        self._entries = LRUCache(size)
+
+    def draw(self, widget, terminal, width):
+        '''Draw the widget or replay its cached output
+
+        Keyword arguments:
+        widget -- the widget to draw
+        terminal -- the output terminal
+        width -- the maximum number of characters to span per line
+
+        '''
+        record = getattr(terminal, 'record', None)
+        if (record is None or not widget.tracked() or
+                widget.retains()):
+            widget.draw(terminal, width)
+            return
+
+        key = (widget, widget.version(), width, terminal.format_key())
+        recording = self._entries.get(key)
+        if recording is not None:
+            terminal.replay(recording)
+            return
+
+        with record() as recording:
+            widget.draw(terminal, width)
+        self._entries.put(key, recording)
+
+    def clear(self):
+        '''Discard all cached output'''
+        self._entries.clear()
+
+    def stats(self):
+        '''Get the hit and miss statistics of the cache'''
+        return {'hits': self._entries.hits,
+                'misses': self._entries.misses,
+                'entries': len(self._entries)}
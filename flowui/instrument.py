@@ -0,0 +1,284 @@
+# FlowUI instrumentation
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import functools
+import time
+import types
+
+from flowui.terminal import AnsiTerminal
+from flowui.terminal import Terminal
+from flowui.wcwidth import _is_ascii
+from flowui.widget import Widget
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+
+def _classes(base):
+    '''Get the class and all of its subclasses'''
+    classes = [base]
+    for cls in classes:
+        for subclass in cls.__subclasses__():
+            if subclass not in classes:
+                classes.append(subclass)
+    return classes
+
+
+def _size(string):
+    if _is_ascii(string) or not hasattr(string, 'encode'):
+        return len(string)
+    return len(string.encode('utf-8'))
+
+
+def _escape_size(string):
+    if '\x1b' not in string:
+        return 0
+    return sum(len(x.group(0)) for x in
+               AnsiTerminal._ansi_escape_expression.finditer(string))
+
+
+class _TerminalStats(object):
+    def __init__(self, name):
+        self.name = name
+        self.writes = 0
+        self.bytes = 0
+        self.escape_bytes = 0
+        self.len_calls = 0
+        self.write_time = 0.0
+
+
+class Instrumentation(object):
+    '''Opt-in instrumentation of terminals and widgets
+
+    While enabled the number of writes, bytes, bytes of escape sequences and
+    len calls as well as the time spent writing is counted per terminal, and
+    the time spent drawing is measured per widget path, i.e. Section>Table>Row.
+    Lines generated by widgets are timed as part of the widget generating
+    them.
+
+    Enabling the instrumentation wraps the methods of all terminal and widget
+    classes defined at that point and disabling it restores the original
+    methods, so there is no overhead at all when disabled. Terminals are
+    kept alive until the instrumentation is reset. Only one instrumentation
+    can be enabled at a time.
+
+    Instrumentation can be used as a context manager:
+
+        with Instrumentation(callback) as instrumentation:
+            section.draw(terminal, terminal.width())
+
+    '''
+    _enabled = None
+
+    def __init__(self, callback=None):
+        '''
+        Keyword arguments:
+        callback -- optional callable passed the profile when disabled
+
+        '''
+        self._callback = callback
+        self._patched = []
+        self._terminals = {}
+        self._widgets = {}
+        self._stack = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    def enable(self):
+        '''Start instrumenting terminals and widgets'''
+        assert Instrumentation._enabled is None
+        Instrumentation._enabled = self
+        for cls in _classes(Terminal):
+            if cls.__name__.startswith('_'):
+                # Terminals recording output for widgets and caches
+                continue
+            self._patch(cls, 'write', self._write)
+            self._patch(cls, 'len', self._len)
+        for cls in _classes(Widget):
+            self._patch(cls, 'draw', self._draw)
+            self._patch(cls, 'lines', self._lines)
+
+    def disable(self):
+        '''Stop instrumenting and pass the profile on to the callback'''
+        if Instrumentation._enabled is not self:
+            return
+        while self._patched:
+            cls, name, method = self._patched.pop()
+            setattr(cls, name, method)
+        Instrumentation._enabled = None
+        if self._callback is not None:
+            self._callback(self.profile())
+
+    def _patch(self, cls, name, wrapper):
+        method = cls.__dict__.get(name)
+        if (not isinstance(method, types.FunctionType) or
+                getattr(method, '__isabstractmethod__', False)):
+            return
+        self._patched.append((cls, name, method))
+        setattr(cls, name, functools.wraps(method)(wrapper(method)))
+
+    def _terminal(self, terminal):
+        stats = self._terminals.get(terminal)
+        if stats is None:
+            stats = _TerminalStats('%s#%d' % (type(terminal).__name__,
+                                              len(self._terminals) + 1))
+            self._terminals[terminal] = stats
+        return stats
+
+    def _write(self, method):
+        def write(terminal, string, dictionary=None):
+            stats = self._terminal(terminal)
+            stats.writes += 1
+            stats.bytes += _size(string)
+            stats.escape_bytes += _escape_size(string)
+            start = _timer()
+            try:
+                return method(terminal, string, dictionary)
+            finally:
+                stats.write_time += _timer() - start
+        return write
+
+    def _len(self, method):
+        def length(terminal, string, dictionary=None):
+            self._terminal(terminal).len_calls += 1
+            return method(terminal, string, dictionary)
+        return length
+
+    def _enter(self, widget):
+        '''Push the widget onto the path unless it is already drawing'''
+        if self._stack and self._stack[-1][0] is widget:
+            return False
+        path = type(widget).__name__
+        if self._stack:
+            path = '%s>%s' % (self._stack[-1][1], path)
+        self._stack.append([widget, path, 0.0])
+        return True
+
+    def _exit(self, elapsed, call):
+        _, path, children = self._stack.pop()
+        stats = self._widgets.get(path)
+        if stats is None:
+            stats = self._widgets[path] = [0, 0.0, 0.0]
+        stats[0] += call
+        stats[1] += elapsed
+        stats[2] += elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def _draw(self, method):
+        def draw(widget, *args, **kwargs):
+            if not self._enter(widget):
+                return method(widget, *args, **kwargs)
+            start = _timer()
+            try:
+                return method(widget, *args, **kwargs)
+            finally:
+                self._exit(_timer() - start, 1)
+        return draw
+
+    def _lines(self, method):
+        def lines(widget, *args, **kwargs):
+            if not self._enter(widget):
+                return method(widget, *args, **kwargs)
+            start = _timer()
+            try:
+                iterator = iter(method(widget, *args, **kwargs))
+            finally:
+                self._exit(_timer() - start, 1)
+            return self._timed(widget, iterator)
+        return lines
+
+    def _timed(self, widget, iterator):
+        while True:
+            entered = self._enter(widget)
+            start = _timer()
+            try:
+                line = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                if entered:
+                    self._exit(_timer() - start, 0)
+            yield line
+
+    def reset(self):
+        '''Discard all measurements'''
+        self._terminals = {}
+        self._widgets = {}
+
+    def profile(self):
+        '''Get the measurements
+
+        Returns a dictionary with the counters of each terminal, named by
+        class and order of first use, and the number of calls as well as the
+        total and own time in seconds spent drawing each widget path.
+
+        '''
+        terminals = {}
+        for stats in self._terminals.values():
+            terminals[stats.name] = {'writes': stats.writes,
+                                     'bytes': stats.bytes,
+                                     'escape_bytes': stats.escape_bytes,
+                                     'len_calls': stats.len_calls,
+                                     'write_time': stats.write_time}
+        widgets = {}
+        for path, (calls, total, own) in self._widgets.items():
+            widgets[path] = {'calls': calls, 'time': total, 'own': own}
+        return {'terminals': terminals, 'widgets': widgets}
+
+    def collapsed(self):
+        '''Get the own time of each widget path as collapsed stacks
+
+        Each line holds a path separated by semicolons followed by the own
+        time in microseconds, the format used by flame graph tools.
+
+        '''
+        return ['%s %d' % (path.replace('>', ';'), stats[2] * 1000000)
+                for path, stats in sorted(self._widgets.items())]
+
+    def report(self, stream):
+        '''Write the measurements as text, slowest widget paths first'''
+        profile = self.profile()
+        stream.write('%-16s %8s %10s %10s %10s %10s\n' %
+                     ('terminal', 'writes', 'bytes', 'escapes', 'len',
+                      'write ms'))
+        for name, stats in sorted(profile['terminals'].items()):
+            stream.write('%-16s %8d %10d %10d %10d %10.3f\n' %
+                         (name, stats['writes'], stats['bytes'],
+                          stats['escape_bytes'], stats['len_calls'],
+                          stats['write_time'] * 1000))
+        stream.write('\n%-40s %8s %10s %10s\n' %
+                     ('widget', 'calls', 'total ms', 'own ms'))
+        for path, stats in sorted(profile['widgets'].items(),
+                                  key=lambda x: -x[1]['own']):
+            stream.write('%-40s %8d %10.3f %10.3f\n' %
+                         (path, stats['calls'], stats['time'] * 1000,
+                          stats['own'] * 1000))
@@ -0,0 +1,71 @@
+# FlowUI lazy attribute loading
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+
+
+def _import(module_name):
+    __import__(module_name)
+    return sys.modules[module_name]
+
+
+def attach(name, attributes):
+    '''Load the attributes of a package on first access
+
+    Returns the module level __getattr__ and __dir__ functions and the list of
+    public names for the package. Each attribute is imported from its module
+    the first time it is accessed and is then stored in the package so that
+    later lookups are regular attribute accesses. Python versions without
+    support for module level __getattr__ import all attributes immediately.
+
+    Keyword arguments:
+    name -- name of the package, i.e. __name__
+    attributes -- dictionary mapping attribute names to the module defining
+                  them, or to None for subpackages
+
+    '''
+    def __getattr__(attribute):
+        if attribute not in attributes:
+            raise AttributeError('module %r has no attribute %r' %
+                                 (name, attribute))
+
+        module_name = attributes[attribute]
+        if module_name is None:
+            value = _import('%s.%s' % (name, attribute))
+        else:
+            value = getattr(_import(module_name), attribute)
+        setattr(sys.modules[name], attribute, value)
+        return value
+
+    def __dir__():
+        return sorted(set(sys.modules[name].__dict__) | set(attributes))
+
+    if sys.version_info < (3, 7):
+        for attribute in attributes:
+            __getattr__(attribute)
+
+    return (__getattr__, __dir__, sorted(attributes))
@@ -0,0 +1,230 @@
+# FlowUI format templates
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import re
+
+from flowui.wcwidth import wcswidth
+
+
+class LRUCache(object):
+    '''Bounded least recently used cache
+
+    Maps keys to values while keeping at most the specified number of entries.
+    When the cache is full the entry that was least recently accessed is
+    evicted to make room for the new one.
+
+    '''
+    def __init__(self, size):
+        '''
+        Keyword arguments:
+        size -- maximum number of entries kept in the cache
+
+        '''
+        assert 0 < size
+        self._size = size
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        '''Get the value stored for key and mark it as recently used'''
+        entries = self._entries
+        if key not in entries:
+            self.misses += 1
+            return default
+
+        value = entries.pop(key)
+        entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        '''Store the value for key, evicting the oldest entry if full'''
+        entries = self._entries
+        entries.pop(key, None)
+        entries[key] = value
+        if self._size < len(entries):
+            entries.popitem(last=False)
+
+    def clear(self):
+        '''Remove all entries from the cache'''
+        self._entries.clear()
+
+
+class Template(object):
+    '''Compiled format string
+
+    Parses a string using dictionary formatting, i.e. %(face-normal)s, once
+    into literal and key segments so that it can be rendered repeatedly
+    without being rescanned. The width of the literal segments is calculated
+    when first needed since keys referring to faces never occupy any space on
+    the terminal.
+
+    Strings using any other kind of conversion than %(key)s and %% are kept as
+    is and rendered using the regular string formatting operator.
+
+    '''
+    _token_expression = re.compile(r'%(?:\(([^()]*)\)s|%)')
+
+    def __init__(self, string, measure=wcswidth):
+        '''
+        Keyword arguments:
+        string -- string containing optional formatting
+        measure -- function returning the width of a literal segment
+
+        '''
+        self._string = string
+        self._measure = measure
+        self._parts = None
+        self._slots = ()
+        self._width = None
+        self.keys = ()
+
+        parts = ['']
+        slots = []
+        offset = 0
+        for match in self._token_expression.finditer(string):
+            literal = string[offset:match.start()]
+            if '%' in literal:
+                return
+
+            key = match.group(1)
+            if key is None:
+                parts[-1] += literal + '%'
+            else:
+                parts[-1] += literal
+                slots.append((len(parts), key))
+                parts.extend([None, ''])
+            offset = match.end()
+
+        literal = string[offset:]
+        if '%' in literal:
+            return
+        parts[-1] += literal
+
+        self._parts = parts
+        self._slots = tuple(slots)
+        self.keys = tuple(key for _, key in slots)
+
+    @property
+    def width(self):
+        '''Width of the literal segments, None if the string isn't compiled'''
+        if self._width is None and self._parts is not None:
+            self._width = sum(self._measure(x) for x in self._parts if x)
+        return self._width
+
+    def compiled(self):
+        '''Check if the string could be split into segments'''
+        return self._parts is not None
+
+    def render(self, faces, dictionary=None):
+        '''Render the template
+
+        Keys are looked up in the optional dictionary first and then in the
+        faces dictionary.
+
+        Keyword arguments:
+        faces -- dictionary mapping face keys to their formatting
+        dictionary -- optional dictionary used together with string formatting
+
+        '''
+        if self._parts is None:
+            d = dict(faces)
+            if dictionary:
+                d.update(dictionary)
+            return self._string % d
+
+        parts = list(self._parts)
+        for index, key in self._slots:
+            if dictionary and key in dictionary:
+                parts[index] = '%s' % (dictionary[key],)
+            else:
+                parts[index] = faces[key]
+        return ''.join(parts)
+
+
+class WidthEngine(object):
+    '''Memoized visible width of format strings
+
+    Calculates the number of characters a string occupies on the terminal
+    straight from its markup by skipping the keys referring to faces, so no
+    escape sequences have to be generated and stripped again. Results are kept
+    in a bounded cache keyed by the string.
+
+    '''
+    DEFAULT_SIZE = 65536
+
+    def __init__(self, keys, size=DEFAULT_SIZE, measure=wcswidth):
+        '''
+        Keyword arguments:
+        keys -- collection of keys that don't occupy any space, i.e. faces
+        size -- maximum number of widths kept in the cache
+        measure -- function returning the width of a literal segment
+
+        '''
+        self._keys = frozenset(keys)
+        self._widths = LRUCache(size)
+        self._measure = measure
+
+    def width(self, string):
+        '''Calculate the width of the string
+
+        Returns None if the string uses formatting that can't be measured
+        without rendering it.
+
+        '''
+        width = self._widths.get(string)
+        if width is not None:
+            return width
+
+        template = Template(string.expandtabs(), self._measure)
+        if not template.compiled():
+            return None
+
+        for key in template.keys:
+            if key not in self._keys:
+                raise KeyError(key)
+
+        self._widths.put(string, template.width)
+        return template.width
+
+    def clear(self):
+        '''Remove all cached widths'''
+        self._widths.clear()
+
+    def stats(self):
+        '''Return a dictionary with the cache statistics'''
+        return {'hits': self._widths.hits,
+                'misses': self._widths.misses,
+                'entries': len(self._widths)}
@@ -26,9 +26,15 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import abc
+import contextlib
+import json
 import re
 
 import flowui.theme
+from flowui.template import LRUCache
+from flowui.template import Template
+from flowui.template import WidthEngine
+from flowui.wcwidth import wcswidth
 
 
 class Terminal(object):
@@ -44,6 +50,13 @@ class Terminal(object):
     DEFAULT_WIDTH = 80
     DEFAULT_HEIGHT = 25
     DEFAULT_DEPTH = 8
+    DEFAULT_BUFFER_SIZE = 65536
+
+    FLUSH_WRITE = 'write'
+    FLUSH_LINE = 'line'
+    FLUSH_FRAME = 'frame'
+
+    _frames = 0
 
     def __init__(self, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT,
                  depth=DEFAULT_DEPTH):
@@ -76,13 +89,37 @@ class Terminal(object):
         '''Calculate the length of a string
 
         Calculates the length of a string, after formatting, in number of
-        characters, including eventual theme formatting, when displayed on the
-        terminal.
+        columns, including eventual theme formatting, when displayed on the
+        terminal. Wide characters occupy two columns and combining characters
+        none.
 
         '''
         if dictionary is not None:
             string = string % dictionary
-        return len(string)
+        return wcswidth(string)
+
+    def flush(self):
+        '''Flush buffered output to the terminal device'''
+        pass
+
+    @contextlib.contextmanager
+    def frame(self):
+        '''Group output into a frame
+
+        Returns a context manager which defers flushing of buffered output
+        until the outermost frame is exited, i.e.
+
+            with terminal.frame():
+                widget.draw(terminal, terminal.width())
+
+        '''
+        self._frames += 1
+        try:
+            yield self
+        finally:
+            self._frames -= 1
+            if not self._frames:
+                self.flush()
 
     def depth(self):
         '''Get the terminal color depth as number of colors'''
@@ -97,6 +134,168 @@ class Terminal(object):
         return self._height
 
 
+class FaceTable(object):
+    '''Compiled escape sequences of a theme
+
+    Holds the SGR escape sequence of every face of a theme at one color depth,
+    indexed by the interned integer ID of each face. Tables are compiled once
+    and then shared by all terminals using the same theme and depth. They must
+    not be modified once created, apart from the escape sequences changing
+    from one face to another which are memoized as they are needed.
+
+    '''
+    def __init__(self, theme, depth, params):
+        '''
+        Keyword arguments:
+        theme -- name of the theme the table was compiled from
+        depth -- depth of terminal in number of colors
+        params -- dictionary mapping face keys to their SGR parameters
+
+        '''
+        self.theme = theme
+        self.depth = depth
+        self.ids = dict((x, flowui.theme.face_id(x)) for x in params)
+
+        size = max(self.ids.values()) + 1 if self.ids else 0
+        self.params = [None] * size
+        self.escapes = [None] * size
+        for name, face_id in self.ids.items():
+            self.params[face_id] = tuple(params[name])
+            self.escapes[face_id] = AnsiTerminal._sgr(*params[name])
+        self.params = tuple(self.params)
+        self.escapes = tuple(self.escapes)
+        self._transitions = {}
+
+        self.faces = dict((x, self.escapes[y]) for x, y in self.ids.items())
+        self.widths = WidthEngine(self.faces,
+                                  measure=AnsiTerminal._visible_len)
+
+    def escape(self, face):
+        '''Get the escape sequence of a face by key or integer ID'''
+        if not isinstance(face, int):
+            face = self.ids[face]
+        return self.escapes[face]
+
+    def _changes(self, current, face_id):
+        params = self.params[face_id]
+        if current is None:
+            return params
+
+        current = self.params[current]
+        if current[0] != params[0]:
+            return params
+
+        # The typeface is followed by a foreground and a background color
+        # consisting of the same number of parameters each.
+        size = int((len(params) - 1) / 2)
+        changes = []
+        for i in (1, 1 + size):
+            if current[i:i + size] != params[i:i + size]:
+                changes.extend(params[i:i + size])
+        return changes
+
+    def transition(self, current, face_id):
+        '''Get the escape sequence changing from one face to another
+
+        Returns only the SGR parameters that differ between the faces, or an
+        empty string if both faces look the same.
+
+        Keyword arguments:
+        current -- integer ID of the face displayed, None if unknown
+        face_id -- integer ID of the face to display
+
+        '''
+        key = (current, face_id)
+        escape = self._transitions.get(key)
+        if escape is None:
+            changes = self._changes(current, face_id)
+            escape = AnsiTerminal._sgr(*changes) if changes else ''
+            self._transitions[key] = escape
+        return escape
+
+    def save(self, path):
+        '''Store the table in the specified file'''
+        faces = dict((x, self.params[y]) for x, y in self.ids.items())
+        with open(path, 'w') as f:
+            json.dump({'theme': self.theme,
+                       'depth': self.depth,
+                       'faces': faces}, f, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        '''Load a table stored in the specified file'''
+        with open(path) as f:
+            data = json.load(f)
+        return cls(str(data['theme']), data['depth'],
+                   dict((str(x), y) for x, y in data['faces'].items()))
+
+
+class SgrState(object):
+    '''Tracks the graphic rendition state of a terminal
+
+    Used in place of the faces dictionary when rendering templates. Looking up
+    a face returns only the SGR parameters that differ from the current state
+    of the terminal, or nothing at all if the terminal already displays the
+    face. The current state is the integer ID of the face last looked up.
+
+    '''
+    def __init__(self, table):
+        '''
+        Keyword arguments:
+        table -- face table used to look up the SGR parameters of faces
+
+        '''
+        self._table = table
+        self.current = None
+        self.emitted = 0
+        self.saved = 0
+
+    def __getitem__(self, key):
+        table = self._table
+        face_id = table.ids[key]
+        escape = table.transition(self.current, face_id)
+        self.current = face_id
+        self.emitted += len(escape)
+        self.saved += len(table.escapes[face_id]) - len(escape)
+        return escape
+
+
+class Recording(object):
+    '''Formatted output recorded from an AnsiTerminal'''
+
+    def __init__(self):
+        self.output = ''
+        self.state = None
+
+
+class _Tee(Terminal):
+    '''Terminal recording all output passed on to another terminal'''
+
+    def __init__(self, terminal):
+        super(_Tee, self).__init__(terminal.width(), terminal.height(),
+                                   terminal.depth())
+        self._terminal = terminal
+        self.chunks = []
+
+    def write(self, string, dictionary=None):
+        if dictionary is not None:
+            string = string % dictionary
+        self.chunks.append(string)
+        self._terminal.write(string)
+
+    def flush(self):
+        self._terminal.flush()
+
+    def frame(self):
+        return self._terminal.frame()
+
+    def width(self):
+        return self._terminal.width()
+
+    def height(self):
+        return self._terminal.height()
+
+
 class AnsiTerminal(Terminal):
     '''Themed terminal decorator
 
@@ -104,51 +303,168 @@ class AnsiTerminal(Terminal):
     theme instance. This is a convenience class so that the terminal and theme
     instances don't have to be passed around together everywhere in the code.
 
+    Optionally the terminal keeps track of the face currently displayed and
+    only emits the escape sequences needed to change it. This assumes that
+    nothing else changes the graphic rendition of the terminal between writes
+    except at the end of lines, which are always reset, so it's off by default
+    in case the output is mixed with that of another application.
+
+    Optionally runs of spaces, i.e. padding, can be compressed into a single
+    space followed by the REP control sequence which repeats it. The output
+    looks the same on terminals supporting REP, such as xterm, but uses far
+    fewer bytes.
+
     '''
     _ansi_escape_expression = re.compile((r'\x1B\[((\d+|"[^"]*")'
                                           r'(;(\d+|"[^"]*"))*)?'
                                           r'[A-Za-z]'))
 
+    TEMPLATE_CACHE_SIZE = 1024
+    PADDING_RUN = 8
+
+    _padding_expression = re.compile(' {%d,}' % PADDING_RUN)
+
+    _templates = LRUCache(TEMPLATE_CACHE_SIZE)
+    _seen = set()
+
+    _face_tables = {}
+
     _properties = {flowui.theme.Regular: 0,
                    flowui.theme.Bold: 1,
                    flowui.theme.Italic: 2,
                    flowui.theme.Underline: 4}
 
-    def _sgr(self, *args):
+    @staticmethod
+    def _sgr(*args):
         return ''.join(['\x1b[', ';'.join([str(x) for x in args]), 'm'])
 
     def reset(self):
         '''Reset terminal formatting back to normal output'''
         self._terminal.write(self._sgr(0))
+        if self._state is not None:
+            self._state.current = None
+
+    def flush(self):
+        self._terminal.flush()
+
+    def frame(self):
+        return self._terminal.frame()
+
+    def width(self):
+        return self._terminal.width()
 
-    def _fmt_depth(self, components, depth):
-        tf = self._properties[components[flowui.theme.Typeface]]
+    def height(self):
+        return self._terminal.height()
+
+    def theme(self):
+        '''Get the theme used to format output'''
+        return self._theme
+
+    def format_key(self):
+        '''Get a key identifying how output is formatted
+
+        Output formatted by terminals with equal keys is identical.
+
+        '''
+        return (self._table.theme, self._table.depth, self._track_sgr,
+                self._compress_padding)
+
+    @contextlib.contextmanager
+    def record(self):
+        '''Record the formatted output written within the context
+
+        Returns a context manager yielding a Recording which holds the output
+        once the context is exited. The recorded output doesn't depend on
+        anything written before it so it can be replayed later on.
+
+        '''
+        recording = Recording()
+        terminal = self._terminal
+        self._terminal = _Tee(terminal)
+        if self._state is not None:
+            self._state.current = None
+        try:
+            yield recording
+        finally:
+            recording.output = ''.join(self._terminal.chunks)
+            self._terminal = terminal
+            if self._state is not None:
+                recording.state = self._state.current
+
+    def replay(self, recording):
+        '''Write recorded output to the terminal again'''
+        self._terminal.write(recording.output)
+        if self._state is not None:
+            self._state.current = recording.state
+
+    @classmethod
+    def _fmt_depth(cls, components, depth):
+        tf = cls._properties[components[flowui.theme.Typeface]]
         fg = components[flowui.theme.fg]
         bg = components[flowui.theme.bg]
         if 16 <= depth:
-            return self._sgr(tf, 38, 5, fg, 48, 5, bg)
+            return (tf, 38, 5, fg, 48, 5, bg)
         else:
-            return self._sgr(tf, (30 + fg), (40 + bg))
+            return (tf, (30 + fg), (40 + bg))
 
-    def _faces_dict(self, theme_, depth):
+    @classmethod
+    def _faces_params(cls, theme_, depth):
         d = {}
         for f in theme_.faces.keys():
             face = theme_.face(f, depth)
-            d[repr(f)] = self._fmt_depth(face, depth)
+            d[repr(f)] = cls._fmt_depth(face, depth)
         return d
 
-    def __init__(self, terminal, theme_):
+    @classmethod
+    def face_table(cls, theme_, depth):
+        '''Get the compiled face table of a theme at the specified depth
+
+        Tables are compiled on first use and then shared.
+
+        '''
+        theme_class = type(theme_)
+        key = ('%s.%s' % (theme_class.__module__, theme_class.__name__),
+               depth)
+        table = cls._face_tables.get(key)
+        if table is None:
+            table = FaceTable(key[0], depth, cls._faces_params(theme_, depth))
+            cls._face_tables[key] = table
+        return table
+
+    @classmethod
+    def load_face_table(cls, path):
+        '''Load a face table stored using FaceTable.save and share it'''
+        table = FaceTable.load(path)
+        cls._face_tables[(table.theme, table.depth)] = table
+        return table
+
+    def __init__(self, terminal, theme_, track_sgr=False,
+                 compress_padding=False):
         '''
         Keyword arguments:
         terminal -- instance of terminal emulator
         theme_ -- instance of theme
+        track_sgr -- only emit escape sequences when the face changes
+        compress_padding -- repeat spaces using REP instead of writing them
 
         '''
         super(AnsiTerminal, self).__init__(terminal.width(),
                                            terminal.height(),
                                            terminal.depth())
-        self._faces = self._faces_dict(theme_, terminal.depth())
         self._terminal = terminal
+        self._track_sgr = track_sgr
+        self._compress_padding = compress_padding
+        self.set_theme(theme_)
+
+    def set_theme(self, theme_):
+        '''Replace the theme used to format output'''
+        self._theme = theme_
+        self._table = self.face_table(theme_, self._terminal.depth())
+        self._faces = self._table.faces
+        self._widths = self._table.widths
+        self._state = None
+        if self._track_sgr:
+            self._state = SgrState(self._table)
 
     def _filter_string(self, string):
         if not len(string):
@@ -156,20 +472,93 @@ class AnsiTerminal(Terminal):
 
         string = string.expandtabs()
         if string[-1] == '\n':
-            string = string[:-1] + ('%s\n' % self._sgr(0))
+            string = string[:-1] + '\x1b[0m\n'
         return ''.join(['%(face-normal)s', string])
 
-    def _fmt_string(self, string, dictionary=None):
-        d = self._faces
-        if dictionary:
-            d.update(dictionary)
-        return self._filter_string(string) % d
+    @staticmethod
+    def _visible_len(string):
+        if '\x1b' not in string:
+            return wcswidth(string)
+        return wcswidth(AnsiTerminal._ansi_escape_expression.sub('', string))
+
+    def _template(self, string):
+        '''Get the template of a string that has been seen before
+
+        Strings are only compiled and cached the second time they are seen so
+        that streams of unique lines don't evict the recurring ones. Returns
+        None on the first sighting.
+
+        '''
+        template = self._templates.get(string)
+        if template is None:
+            seen = self._seen
+            if string not in seen:
+                if 4 * self.TEMPLATE_CACHE_SIZE <= len(seen):
+                    seen.clear()
+                seen.add(string)
+                return None
+            template = Template(self._filter_string(string),
+                                self._visible_len)
+            self._templates.put(string, template)
+        return template
 
     def len(self, string, dictionary=None):
-        filtered = self._fmt_string(string, dictionary)
-        return len(self._ansi_escape_expression.sub('', filtered))
+        if not dictionary:
+            width = self._widths.width(string)
+            if width is not None:
+                return width
+
+        template = self._template(string)
+        if template is None:
+            template = Template(self._filter_string(string),
+                                self._visible_len)
+        if not template.compiled():
+            return self._visible_len(template.render(self._faces, dictionary))
+
+        width = template.width
+        for key in template.keys:
+            if dictionary and key in dictionary:
+                width += self._visible_len('%s' % (dictionary[key],))
+            elif key not in self._faces:
+                raise KeyError(key)
+        return width
+
+    def width_stats(self):
+        '''Get the hit and miss statistics of the width cache'''
+        return self._widths.stats()
+
+    @staticmethod
+    def _repeat_padding(match):
+        return ' \x1b[%db' % (len(match.group(0)) - 1)
+
+    def sgr_stats(self):
+        '''Get the number of escape sequence characters emitted and saved'''
+        if self._state is None:
+            return {'emitted': 0, 'saved': 0}
+        return {'emitted': self._state.emitted, 'saved': self._state.saved}
 
     def write(self, string, dictionary=None):
         '''Apply theme formatting and return the resulting string'''
-        filtered = self._fmt_string(string, dictionary)
+        template = self._template(string)
+        state = self._state
+        if template is None:
+            faces = self._faces if state is None or dictionary else state
+            if dictionary:
+                faces = dict(faces)
+                faces.update(dictionary)
+            filtered = self._filter_string(string) % faces
+            if state is not None and (faces is not state or '\x1b' in string
+                                      or filtered[-1:] == '\n'):
+                state.current = None
+        elif state is None or not template.compiled():
+            filtered = template.render(self._faces, dictionary)
+            if state is not None:
+                state.current = None
+        else:
+            filtered = template.render(state, dictionary)
+            if dictionary or '\x1b' in string or filtered[-1:] == '\n':
+                state.current = None
+        if self._compress_padding and ' ' * self.PADDING_RUN in filtered:
+            filtered = self._padding_expression.sub(self._repeat_padding,
+                                                    filtered)
         self._terminal.write(filtered)
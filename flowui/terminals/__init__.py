@@ -25,4 +25,17 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from flowui.terminals.systerminal import SysTerminal
+import sys
+
+from flowui.lazy import attach
+
+
+_attributes = {
+    'FanOutTerminal': 'flowui.terminals.fanoutterminal',
+    'StringTerminal': 'flowui.terminals.stringterminal',
+    'SysTerminal': 'flowui.terminals.systerminal',
+    'render': 'flowui.terminals.stringterminal'}
+if (3, 5) <= sys.version_info:
+    _attributes['AsyncTerminal'] = 'flowui.terminals.asyncterminal'
+
+__getattr__, __dir__, __all__ = attach(__name__, _attributes)
@@ -0,0 +1,125 @@
+# FlowUI asyncio terminal
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+
+from flowui.terminal import AnsiTerminal
+from flowui.terminal import Terminal
+
+
+class _StreamTerminal(Terminal):
+    '''Terminal buffering encoded output for an asyncio stream writer'''
+
+    def __init__(self, writer, width, height, depth, encoding, buffer_size):
+        super(_StreamTerminal, self).__init__(width, height, depth)
+        self._writer = writer
+        self._encoding = encoding
+        self._buffer_size = buffer_size
+        self._buffer = []
+        self._buffered = 0
+
+    def write(self, string, dictionary=None):
+        if dictionary is not None:
+            string = string % dictionary
+        self._buffer.append(string)
+        self._buffered += len(string)
+        if self._buffer_size <= self._buffered:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._writer.write(''.join(self._buffer).encode(self._encoding))
+            self._buffer = []
+            self._buffered = 0
+
+    def pending(self):
+        '''Get the number of bytes waiting to be sent to the client'''
+        return self._writer.transport.get_write_buffer_size()
+
+
+class AsyncTerminal(AnsiTerminal):
+    '''Themed terminal writing to an asyncio stream
+
+    Output is formatted like on an AnsiTerminal, encoded and passed to an
+    asyncio.StreamWriter, i.e. a network client. Writing never blocks, output
+    is buffered until it is flushed or the buffer is full. Coroutines wait for
+    slow clients using drain, draw does so while drawing a widget so that a
+    single client never holds more than a bounded amount of output while
+    other tasks keep running.
+
+    '''
+    def __init__(self, writer, theme_, width=Terminal.DEFAULT_WIDTH,
+                 height=Terminal.DEFAULT_HEIGHT, depth=Terminal.DEFAULT_DEPTH,
+                 encoding='utf-8', buffer_size=Terminal.DEFAULT_BUFFER_SIZE,
+                 track_sgr=False, compress_padding=False):
+        '''
+        Keyword arguments:
+        writer -- instance of asyncio.StreamWriter
+        theme_ -- instance of theme
+        width -- visible width of terminal in characters
+        height -- visible height of terminal in rows
+        depth -- depth of terminal in number of colors
+        encoding -- encoding of the output sent to the writer
+        buffer_size -- number of characters buffered before they are sent
+        track_sgr -- only emit escape sequences when the face changes
+        compress_padding -- repeat spaces using REP instead of writing them
+
+        '''
+        stream = _StreamTerminal(writer, width, height, depth, encoding,
+                                 buffer_size)
+        super(AsyncTerminal, self).__init__(stream, theme_, track_sgr,
+                                            compress_padding)
+        self._buffer_size = buffer_size
+
+    async def drain(self):
+        '''Send buffered output and wait until the client has caught up'''
+        self._terminal.flush()
+        await self._terminal._writer.drain()
+
+    async def draw(self, widget, width=None):
+        '''Draw the widget and send it to the client
+
+        Lines of the widget are generated one at a time and whenever a buffer
+        worth of output is waiting to be sent the drawing yields to other
+        tasks, until the client has caught up if it is slow.
+
+        Keyword arguments:
+        widget -- the widget to draw
+        width -- the maximum number of characters to span per line, defaults
+                 to the width of the terminal
+
+        '''
+        if width is None:
+            width = self.width()
+
+        stream = self._terminal
+        for line in widget.lines(self, width):
+            self.write('%s\n' % line)
+            if self._buffer_size <= stream.pending():
+                await stream._writer.drain()
+                await asyncio.sleep(0)
+        await self.drain()
@@ -0,0 +1,150 @@
+# FlowUI fan-out terminal
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import contextlib
+
+from flowui.terminal import AnsiTerminal
+from flowui.terminal import Terminal
+
+
+class _Group(Terminal):
+    '''Terminal passing output on to several terminals of the same depth'''
+
+    def __init__(self, sinks):
+        super(_Group, self).__init__(sinks[0].width(), sinks[0].height(),
+                                     sinks[0].depth())
+        self._sinks = sinks
+
+    def write(self, string, dictionary=None):
+        if dictionary is not None:
+            string = string % dictionary
+        for sink in self._sinks:
+            sink.write(string)
+
+    def flush(self):
+        for sink in self._sinks:
+            sink.flush()
+
+
+class FanOutTerminal(Terminal):
+    '''Themed terminal writing the same output to several terminals
+
+    Output is formatted like on an AnsiTerminal, but only once for every
+    color depth used by the sink terminals, and the formatted output is then
+    written to each sink of that depth. Widgets drawn onto the terminal are
+    therefore measured and formatted once no matter the number of sinks.
+
+    The width and height are those of the first sink unless specified.
+
+    '''
+    def __init__(self, sinks, theme_, width=None, height=None,
+                 track_sgr=False, compress_padding=False):
+        '''
+        Keyword arguments:
+        sinks -- list of terminals receiving the output
+        theme_ -- instance of theme
+        width -- visible width of terminal in characters
+        height -- visible height of terminal in rows
+        track_sgr -- only emit escape sequences when the face changes
+        compress_padding -- repeat spaces using REP instead of writing them
+
+        '''
+        assert sinks
+        depths = []
+        groups = {}
+        for sink in sinks:
+            if sink.depth() not in groups:
+                depths.append(sink.depth())
+                groups[sink.depth()] = []
+            groups[sink.depth()].append(sink)
+
+        super(FanOutTerminal, self).__init__(
+            sinks[0].width() if width is None else width,
+            sinks[0].height() if height is None else height,
+            max(depths))
+        self._sinks = list(sinks)
+        self._terminals = [AnsiTerminal(_Group(groups[x]), theme_, track_sgr,
+                                        compress_padding) for x in depths]
+
+    def set_theme(self, theme_):
+        '''Replace the theme used to format output'''
+        for terminal in self._terminals:
+            terminal.set_theme(theme_)
+
+    def reset(self):
+        '''Reset terminal formatting back to normal output'''
+        for terminal in self._terminals:
+            terminal.reset()
+
+    def format_key(self):
+        '''Get a key identifying how output is formatted'''
+        return tuple(x.format_key() for x in self._terminals)
+
+    @contextlib.contextmanager
+    def record(self):
+        '''Record the formatted output written within the context
+
+        Returns a context manager yielding a list holding one Recording per
+        color depth once the context is exited.
+
+        '''
+        recordings = []
+        contexts = [x.record() for x in self._terminals]
+        try:
+            for context in contexts:
+                recordings.append(context.__enter__())
+            yield recordings
+        finally:
+            for context in reversed(contexts[:len(recordings)]):
+                context.__exit__(None, None, None)
+
+    def replay(self, recordings):
+        '''Write recorded output to the terminal again'''
+        for terminal, recording in zip(self._terminals, recordings):
+            terminal.replay(recording)
+
+    def write(self, string, dictionary=None):
+        for terminal in self._terminals:
+            terminal.write(string, dictionary)
+
+    def len(self, string, dictionary=None):
+        return self._terminals[0].len(string, dictionary)
+
+    def flush(self):
+        for sink in self._sinks:
+            sink.flush()
+
+    @contextlib.contextmanager
+    def frame(self):
+        frames = [x.frame() for x in self._sinks]
+        for frame in frames:
+            frame.__enter__()
+        try:
+            yield self
+        finally:
+            for frame in reversed(frames):
+                frame.__exit__(None, None, None)
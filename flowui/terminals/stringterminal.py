@@ -0,0 +1,91 @@
+# FlowUI string terminal
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from flowui.terminal import AnsiTerminal
+from flowui.terminal import Terminal
+
+
+class StringTerminal(Terminal):
+    '''In-memory terminal
+
+    This terminal collects all output in memory instead of writing it to a
+    device so that it can be retrieved as one string, i.e. to render widgets
+    into log files, sockets or caches.
+
+    '''
+    def __init__(self, width=Terminal.DEFAULT_WIDTH,
+                 height=Terminal.DEFAULT_HEIGHT, depth=Terminal.DEFAULT_DEPTH):
+        '''
+        Keyword arguments:
+        width -- visible width of terminal in characters
+        height -- visible height of terminal in rows
+        depth -- depth of terminal in number of colors
+
+        '''
+        super(StringTerminal, self).__init__(width, height, depth)
+        self._chunks = []
+
+    def write(self, string, dictionary=None):
+        if dictionary is not None:
+            string = string % dictionary
+        self._chunks.append(string)
+
+    def getvalue(self):
+        '''Get all output written to the terminal as one string'''
+        if 1 < len(self._chunks):
+            self._chunks = [''.join(self._chunks)]
+        return self._chunks and self._chunks[0] or ''
+
+    def clear(self):
+        '''Discard all output written to the terminal'''
+        self._chunks = []
+
+
+def render(widget, width, theme, depth=256, encoding=None):
+    '''Render a widget and return the output
+
+    Draws the widget using the theme onto an in-memory terminal and returns the
+    complete output as a string, or as bytes if an encoding is specified.
+    Byte strings drawn by the widget, i.e. contents of cells on Python 2, are
+    expected to be encoded as UTF-8.
+
+    Keyword arguments:
+    widget -- the widget to render
+    width -- the maximum number of characters to span per line
+    theme -- instance of theme
+    depth -- depth of terminal in number of colors
+    encoding -- optional encoding of the returned output
+
+    '''
+    terminal = StringTerminal(width, Terminal.DEFAULT_HEIGHT, depth)
+    widget.draw(AnsiTerminal(terminal, theme), width)
+    output = terminal.getvalue()
+    if encoding is not None:
+        if isinstance(output, bytes):
+            output = output.decode('utf-8')
+        return output.encode(encoding)
+    return output
@@ -26,26 +26,194 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import signal
+import struct
+import sys
 from sys import stdout
 
+try:
+    import fcntl
+    import termios
+except ImportError:
+    fcntl = None
+
 from flowui.terminal import Terminal
 
 
+_TERMINFO_DIRS = ['/etc/terminfo', '/lib/terminfo', '/usr/share/terminfo',
+                  '/usr/lib/terminfo']
+_TERMINFO_COLORS = 13
+
+_colors = {}
+_resizes = 0
+_resize_handler = None
+
+
+def _terminfo_path(term):
+    dirs = []
+    if os.environ.get('TERMINFO'):
+        dirs.append(os.environ['TERMINFO'])
+    dirs.append(os.path.expanduser('~/.terminfo'))
+    for d in os.environ.get('TERMINFO_DIRS', '').split(':'):
+        dirs.extend(d and [d] or _TERMINFO_DIRS)
+    dirs.extend(_TERMINFO_DIRS)
+
+    for d in dirs:
+        for subdir in (term[0], '%02x' % ord(term[0])):
+            path = os.path.join(d, subdir, term)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def _terminfo_colors(term):
+    '''Read the number of colors from the compiled terminfo entry of term'''
+    path = _terminfo_path(term)
+    if path is None:
+        return None
+
+    with open(path, 'rb') as entry:
+        data = entry.read()
+
+    magic, names, booleans, numbers = struct.unpack('<4h', data[:8])
+    if magic == 0o432:
+        number_format = '<h'
+    elif magic == 0o1036:
+        number_format = '<i'
+    else:
+        return None
+
+    if numbers <= _TERMINFO_COLORS:
+        return -1
+    size = struct.calcsize(number_format)
+    offset = 12 + names + booleans + ((names + booleans) % 2)
+    offset += _TERMINFO_COLORS * size
+    return struct.unpack(number_format, data[offset:offset + size])[0]
+
+
+def _depth(term):
+    '''Get the color depth of term, the result is cached per $TERM'''
+    if term not in _colors:
+        colors = None
+        if term:
+            try:
+                colors = _terminfo_colors(term)
+            except (IOError, OSError, struct.error):
+                colors = None
+        if colors is None:
+            colors = term.endswith('256color') and 256 or -1
+        _colors[term] = colors
+    return max(_colors[term], Terminal.DEFAULT_DEPTH)
+
+
+def _size():
+    '''Get the size of the controlling terminal as (width, height)'''
+    if fcntl is not None:
+        for stream in (stdout, sys.stdin, sys.stderr):
+            try:
+                winsize = fcntl.ioctl(stream.fileno(), termios.TIOCGWINSZ,
+                                      struct.pack('4H', 0, 0, 0, 0))
+            except (AttributeError, IOError, OSError, ValueError):
+                continue
+            height, width = struct.unpack('4H', winsize)[:2]
+            if width and height:
+                return (width, height)
+
+    try:
+        return (int(os.environ['COLUMNS']), int(os.environ['LINES']))
+    except (KeyError, ValueError):
+        return (Terminal.DEFAULT_WIDTH, Terminal.DEFAULT_HEIGHT)
+
+
+def _on_resize(signum, frame):
+    global _resizes
+    _resizes += 1
+    if callable(_resize_handler):
+        _resize_handler(signum, frame)
+
+
+def _watch_resize():
+    '''Count SIGWINCH signals, chaining any previously installed handler'''
+    global _resize_handler
+    if (not hasattr(signal, 'SIGWINCH') or
+            signal.getsignal(signal.SIGWINCH) is _on_resize):
+        return
+
+    try:
+        _resize_handler = signal.signal(signal.SIGWINCH, _on_resize)
+    except ValueError:
+        # Signal handlers can only be installed from the main thread.
+        pass
+
+
 class SysTerminal(Terminal):
     '''Python sys based terminal
 
     This terminal emulator is using the sys.stdout interface defined by the
     Python runtime.
 
+    Output can optionally be buffered and flushed according to one of the
+    following policies:
+    FLUSH_WRITE -- every write is passed straight on to sys.stdout (default)
+    FLUSH_LINE -- buffered output is flushed when a line is completed
+    FLUSH_FRAME -- buffered output is flushed when the outermost frame is
+                   exited or when flush is called
+
+    Buffered output is also flushed whenever it exceeds the buffer size.
+
+    The size of the terminal is read from the terminal device and refreshed
+    when the process receives SIGWINCH. The color depth is read from the
+    terminfo database entry of $TERM.
+
     '''
-    def __init__(self):
-        width = int(os.popen('tput cols').read().strip())
-        height = int(os.popen('tput lines').read().strip())
-        depth = max(int(os.popen('tput colors').read().strip()),
-                    Terminal.DEFAULT_DEPTH)
+    def __init__(self, flush=Terminal.FLUSH_WRITE,
+                 buffer_size=Terminal.DEFAULT_BUFFER_SIZE):
+        '''
+        Keyword arguments:
+        flush -- flush policy of the output buffer
+        buffer_size -- number of characters to buffer before flushing
+
+        '''
+        _watch_resize()
+        self._resizes = _resizes
+        width, height = _size()
+        depth = _depth(os.environ.get('TERM', ''))
         super(SysTerminal, self).__init__(width, height, depth)
+        self._policy = flush
+        self._buffer = []
+        self._buffered = 0
+        self._buffer_size = buffer_size
+
+    def _refresh_size(self):
+        if self._resizes != _resizes:
+            self._resizes = _resizes
+            self._width, self._height = _size()
+
+    def width(self):
+        self._refresh_size()
+        return self._width
+
+    def height(self):
+        self._refresh_size()
+        return self._height
 
     def write(self, string, dictionary=None):
         if dictionary is not None:
             string = string % dictionary
-        stdout.write(string)
+        if self._policy == Terminal.FLUSH_WRITE and not self._frames:
+            stdout.write(string)
+            return
+
+        self._buffer.append(string)
+        self._buffered += len(string)
+        if (self._buffer_size <= self._buffered or
+                (self._policy == Terminal.FLUSH_LINE and not self._frames and
+                 '\n' in string)):
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            stdout.write(''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        stdout.flush()
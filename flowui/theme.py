@@ -52,6 +52,18 @@ class _Face(tuple):
         return 'face' + (self and '-' or '') + '-'.join(self).lower()
 
 
+_face_ids = {}
+
+
+def face_id(face):
+    '''Get the interned integer ID of a face or face key'''
+    key = repr(face) if isinstance(face, _Face) else face
+    try:
+        return _face_ids[key]
+    except KeyError:
+        return _face_ids.setdefault(key, len(_face_ids))
+
+
 Face = _Face()
 Normal = Face.Normal
 Comment = Face.Comment
@@ -165,7 +177,7 @@ class ThemeMeta(type):
         return type.__call__(cls, *args, **kwds)
 
 
-class Theme(object):
+class Theme(ThemeMeta('_ThemeBase', (object,), {})):
     '''Base class for all FlowUI themes
 
     The Theme class provides all the basic functionality required to make a
@@ -197,8 +209,6 @@ class Theme(object):
     face-header     -- section headers etc
 
     '''
-    __metaclass__ = ThemeMeta
-
     name = None
     colors = []
     faces = {}
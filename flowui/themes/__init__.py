@@ -25,5 +25,9 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from flowui.themes.solarized import Solarized
-from flowui.themes.zenburn import Zenburn
+from flowui.lazy import attach
+
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    'Solarized': 'flowui.themes.solarized',
+    'Zenburn': 'flowui.themes.zenburn'})
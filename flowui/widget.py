@@ -27,6 +27,47 @@
 
 import abc
 
+from flowui.terminal import Terminal
+
+
+class _Markup(dict):
+    def __getitem__(self, key):
+        if key in self:
+            return ('%s' % (dict.__getitem__(self, key),)).replace('%', '%%')
+        return '%%(%s)s' % key
+
+
+class _LineRecorder(Terminal):
+    '''Terminal recording the formatted output of a widget'''
+
+    def __init__(self, terminal):
+        super(_LineRecorder, self).__init__()
+        self._terminal = terminal
+        self._chunks = []
+
+    def write(self, string, dictionary=None):
+        if dictionary is not None:
+            string = string.replace('%%', '%%%%') % _Markup(dictionary)
+        self._chunks.append(string)
+
+    def len(self, string, dictionary=None):
+        return self._terminal.len(string, dictionary)
+
+    def depth(self):
+        return self._terminal.depth()
+
+    def width(self):
+        return self._terminal.width()
+
+    def height(self):
+        return self._terminal.height()
+
+    def lines(self):
+        lines = ''.join(self._chunks).split('\n')
+        if not lines[-1]:
+            lines.pop()
+        return lines
+
 
 class Widget(object):
     '''Abstract base class for all Widgets
@@ -38,6 +79,55 @@ class Widget(object):
 
     __metaclass__ = abc.ABCMeta
 
+    _version = 0
+    _parents = ()
+
+    def version(self):
+        '''Get the version of the widget contents
+
+        The version changes whenever the widget is modified, i.e. so that
+        output drawn from an earlier version can be reused.
+
+        '''
+        return self._version
+
+    def tracked(self):
+        '''Check whether the version changes whenever the widget is modified
+
+        Containers only reuse the output of components which are tracked,
+        widgets which touch themselves on every modification override this.
+
+        '''
+        return False
+
+    def retains(self):
+        '''Check whether the widget keeps its own formatted output
+
+        Containers and render caches don't record the output of widgets which
+        replay the output they keep themselves, so that it's only kept once.
+
+        '''
+        return False
+
+    def touch(self):
+        '''Mark the widget, and the widgets containing it, as modified'''
+        self._version += 1
+        for parent in self._parents:
+            parent._child_touched(self)
+
+    def _adopt(self, child):
+        '''Mark the widget as modified whenever the child is touched'''
+        if self not in child._parents:
+            child._parents += (self,)
+
+    def _child_touched(self, child):
+        self.touch()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('_parents', None)
+        return state
+
     @abc.abstractmethod
     def draw(self, terminal, width):
         '''Render the widget
@@ -51,3 +141,22 @@ class Widget(object):
 
         '''
         raise NotImplementedError()
+
+    def lines(self, terminal, width):
+        '''Generate the lines of the widget
+
+        Yields each line the widget draws onto the specified terminal,
+        constrained to the specified width, as a formatted string without the
+        trailing newline. Widgets able to produce their lines one at a time
+        override this while the default implementation draws the whole widget
+        and splits the output.
+
+        Keyword arguments:
+        terminal -- the output terminal
+        width -- the maximum number of characters to span per line
+
+        '''
+        recorder = _LineRecorder(terminal)
+        self.draw(recorder, width)
+        for line in recorder.lines():
+            yield line
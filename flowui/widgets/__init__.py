@@ -25,7 +25,14 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from flowui.widgets.container import Section
-from flowui.widgets.table import Cell
-from flowui.widgets.table import Row
-from flowui.widgets.table import Table
+from flowui.lazy import attach
+
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    'Cached': 'flowui.widgets.cached',
+    'Cell': 'flowui.widgets.table',
+    'Row': 'flowui.widgets.table',
+    'Section': 'flowui.widgets.container',
+    'StreamingTable': 'flowui.widgets.table',
+    'Table': 'flowui.widgets.table',
+    'TableLayout': 'flowui.widgets.table'})
@@ -0,0 +1,66 @@
+# FlowUI cached widget
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from flowui.cache import RenderCache
+from flowui.widget import Widget
+
+
+class Cached(Widget):
+    '''Cached widget
+
+    Draws another widget through a render cache so that its output is only
+    drawn again after the widget has been modified, i.e. a static header or
+    table inside a section which is redrawn often. Widgets which don't track
+    their modifications are drawn every time.
+
+    '''
+    _cache = RenderCache()
+
+    def __init__(self, widget, cache=None):
+        '''
+        Keyword arguments:
+        widget -- the widget to draw
+        cache -- optional RenderCache, by default a cache shared by all cached
+                 widgets is used
+
+        '''
+        self._widget = widget
+        self._adopt(widget)
+        if cache is not None:
+            self._cache = cache
+
+    def version(self):
+        return self._widget.version()
+
+    def tracked(self):
+        return self._widget.tracked()
+
+    def retains(self):
+        return self._widget.tracked()
+
+    def draw(self, terminal, width):
+        self._cache.draw(self._widget, terminal, width)
@@ -34,38 +34,84 @@ class Section(Widget):
     This widget provides a section into which other widgets can be grouped. It
     supports an optional headline which can be used to describe its contents.
 
+    Optionally the formatted output of each tracked component is kept when
+    drawn on a terminal which can record its output, redrawing the section
+    then only draws the components which have been modified since. The output
+    of components which keep their own, such as cached widgets, isn't kept.
+
     '''
     _name = None
     _components = None
+    _outputs = None
+    _retain = False
 
-    def __init__(self, name=None):
+    def __init__(self, name=None, retain=False):
         '''
         Keyword arguments:
         name -- optional name to use in section headline
+        retain -- keep the output of tracked components to redraw them
 
         '''
         self._name = name
         self._components = []
+        self._outputs = {}
+        self._retain = retain
 
-    def _draw_header(self, terminal, width):
+    def _header(self, terminal, width):
         title = ''
         if self._name:
             title = ('[%s]' % self._name)
         assert terminal.len(title) <= width
 
-        header = ['%(face-header)s']
-        dashes = int(width - len(title))
-        header += ['-' for _ in range(dashes)]
-        header += [title, '\n']
-        terminal.write(''.join(header))
+        dashes = int(width - terminal.len(title))
+        return ''.join(['%(face-header)s', '-' * dashes, title])
 
     def add_component(self, component):
         '''Adds the specified component to the section'''
         self._components.append(component)
+        self._adopt(component)
+        self.touch()
 
-    def draw(self, terminal, width):
-        width -= (width / 20)
-        self._draw_header(terminal, width)
+    def tracked(self):
+        for component in self._components:
+            if not component.tracked():
+                return False
+        return True
+
+    def retains(self):
+        return self._retain
+
+    def lines(self, terminal, width):
+        '''Generate the lines of the section constrained to the specified
+        width'''
+        width -= int(width / 20)
+        yield self._header(terminal, width)
 
         for component in self._components:
-            component.draw(terminal, width)
+            for line in component.lines(terminal, width):
+                yield line
+
+    def draw(self, terminal, width):
+        width -= int(width / 20)
+        terminal.write('%s\n' % self._header(terminal, width))
+
+        record = getattr(terminal, 'record', None)
+        if not self._retain:
+            record = None
+        for index in range(len(self._components)):
+            component = self._components[index]
+            if (record is None or not component.tracked() or
+                    component.retains()):
+                component.draw(terminal, width)
+                continue
+
+            key = (component, component.version(), width,
+                   terminal.format_key())
+            output = self._outputs.get(index)
+            if output is not None and output[0] == key:
+                terminal.replay(output[1])
+                continue
+
+            with record() as recording:
+                component.draw(terminal, width)
+            self._outputs[index] = (key, recording)
@@ -0,0 +1,183 @@
+# FlowUI table layout
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from array import array
+
+
+def water_fill(width, maximums, minimums=None, weights=None):
+    '''Distribute a width between columns
+
+    Every column gets its minimum width and the rest of the width is poured
+    into the columns in proportion to their weights until they reach their
+    maximum width or the width runs out. Narrow columns thereby keep their
+    full width while wide ones share what is left. Columns without weight
+    only get their minimum width.
+
+    The widths are found in O(n log n) time by sweeping over the levels at
+    which columns start and stop growing, fractions are then handed out to
+    the columns with the largest remainders and the lowest indices so that
+    the result is deterministic.
+
+    Returns a list of integer widths which is at least as wide as the sum of
+    the minimums but never wider than the sum of the maximums or the width
+    unless the minimums are.
+
+    Keyword arguments:
+    width -- width to distribute
+    maximums -- list of the maximum width of each column
+    minimums -- optional list of the minimum width of each column
+    weights -- optional list of the weight of each column, defaults to 1
+
+    '''
+    count = len(maximums)
+    if minimums is None:
+        minimums = [0] * count
+    if weights is None:
+        weights = [1] * count
+    maximums = [max(maximums[i], minimums[i]) for i in range(count)]
+    if sum(maximums) <= width:
+        return maximums
+    if width <= sum(minimums):
+        return list(minimums)
+
+    events = []
+    for i in range(count):
+        if 0 < weights[i] and minimums[i] < maximums[i]:
+            events.append((minimums[i] / float(weights[i]), i, True))
+            events.append((maximums[i] / float(weights[i]), i, False))
+    events.sort()
+
+    # The sum of the widths at a level is base + slope * level until the next
+    # column starts or stops growing.
+    base = float(sum(minimums))
+    slope = 0.0
+    level = None
+    for point, i, starts in events:
+        if width <= base + slope * point:
+            level = (width - base) / slope
+            break
+        if starts:
+            base -= minimums[i]
+            slope += weights[i]
+        else:
+            base += maximums[i]
+            slope -= weights[i]
+
+    filled = []
+    for i in range(count):
+        if weights[i] <= 0:
+            filled.append(minimums[i])
+        elif level is None:
+            filled.append(maximums[i])
+        else:
+            filled.append(min(max(weights[i] * level, minimums[i]),
+                              maximums[i]))
+
+    widths = [int(x) for x in filled]
+    if level is not None:
+        remainders = sorted((widths[i] - filled[i], i) for i in range(count)
+                            if widths[i] < maximums[i])
+        for _, i in remainders[:width - sum(widths)]:
+            widths[i] += 1
+    return widths
+
+
+class ColumnWidths(object):
+    '''Matrix of cell widths stored by column
+
+    Widths are kept in one compact typed array per column. The maximum width
+    of each column is kept up to date as rows are added and replaced, and
+    only scanned again when the widest cell of a column gets narrower.
+
+    '''
+    def __init__(self, columns):
+        '''
+        Keyword arguments:
+        columns -- number of columns in the matrix
+
+        '''
+        self._columns = [array('H') for _ in range(columns)]
+        self._maximums = [0] * columns
+        self._rows = 0
+
+    def __len__(self):
+        return len(self._columns)
+
+    def rows(self):
+        '''Get the number of rows in the matrix'''
+        return self._rows
+
+    def column(self, index):
+        '''Get the widths of the specified column'''
+        return self._columns[index]
+
+    def add_row(self, widths):
+        '''Append a row of widths, missing columns are zero wide'''
+        columns = self._columns
+        for i in range(len(columns)):
+            width = 0
+            if i < len(widths):
+                width = widths[i]
+            try:
+                columns[i].append(width)
+            except OverflowError:
+                columns[i] = array('L', columns[i])
+                columns[i].append(width)
+            if self._maximums[i] is not None:
+                self._maximums[i] = max(self._maximums[i], width)
+        self._rows += 1
+
+    def set_row(self, index, widths):
+        '''Replace the widths of a row, missing columns are zero wide'''
+        columns = self._columns
+        for i in range(len(columns)):
+            width = 0
+            if i < len(widths):
+                width = widths[i]
+            previous = columns[i][index]
+            try:
+                columns[i][index] = width
+            except OverflowError:
+                columns[i] = array('L', columns[i])
+                columns[i][index] = width
+
+            maximum = self._maximums[i]
+            if maximum is None:
+                continue
+            elif maximum <= width:
+                self._maximums[i] = width
+            elif previous == maximum:
+                self._maximums[i] = None
+
+    def maximum(self):
+        '''Get the maximum width of each column'''
+        maximums = self._maximums
+        for i in range(len(maximums)):
+            if maximums[i] is None:
+                column = self._columns[i]
+                maximums[i] = max(column) if len(column) else 0
+        return list(maximums)
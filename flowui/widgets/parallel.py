@@ -0,0 +1,155 @@
+# FlowUI parallel table layout
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+import sys
+
+from flowui.terminal import AnsiTerminal
+from flowui.terminals.stringterminal import StringTerminal
+from flowui.widgets.table import _row_lines
+
+
+_terminal = None
+
+
+def _free_threaded():
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _init_worker(theme_, width, height, depth):
+    global _terminal
+    _terminal = AnsiTerminal(StringTerminal(width, height, depth), theme_)
+
+
+def _widths(terminal, rows):
+    terminal = terminal or _terminal
+    return [[x.width(terminal) for x in row.cells()] for row in rows]
+
+
+def _lines(terminal, rows, cell_widths, width):
+    terminal = terminal or _terminal
+    return list(_row_lines(terminal, rows, cell_widths, width))
+
+
+def _lines_by_row(terminal, rows, cell_widths, width):
+    terminal = terminal or _terminal
+    return [list(_row_lines(terminal, [x], cell_widths, width)) for x in rows]
+
+
+def executor(terminal, workers):
+    '''Create an executor for the terminal
+
+    Returns None if the rows drawn on the terminal can't be formatted in
+    parallel.
+
+    '''
+    threads = _free_threaded()
+    if not threads and not isinstance(terminal, AnsiTerminal):
+        return None
+    return Executor(terminal, workers, threads)
+
+
+class Executor(object):
+    '''Lays out and formats table rows in parallel
+
+    Rows are split into chunks which are measured and formatted by a pool of
+    worker processes, or threads on Python builds without the global
+    interpreter lock. Results are returned in the same order as the rows so
+    the output is identical to drawing the rows serially.
+
+    Worker processes format the rows using their own AnsiTerminal with the
+    same theme and size, rows are therefore pickled and any other kind of
+    terminal is only supported using threads.
+
+    '''
+    CHUNK_SIZE = 1024
+
+    def __init__(self, terminal, workers, threads=None):
+        '''
+        Keyword arguments:
+        terminal -- the output terminal
+        workers -- number of worker processes or threads
+        threads -- use threads instead of processes, defaults to using
+                   threads when the interpreter is free-threaded
+
+        '''
+        if threads is None:
+            threads = _free_threaded()
+        assert threads or isinstance(terminal, AnsiTerminal)
+
+        self._terminal = None
+        if threads:
+            self._terminal = terminal
+            self._executor = ThreadPoolExecutor(workers)
+        else:
+            self._executor = ProcessPoolExecutor(
+                workers, initializer=_init_worker,
+                initargs=(terminal._theme, terminal.width(),
+                          terminal.height(), terminal.depth()))
+        self._pending = 2 * workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def shutdown(self):
+        '''Stop the workers'''
+        self._executor.shutdown()
+
+    def _map(self, function, rows, *args):
+        pending = deque()
+        for start in range(0, len(rows), self.CHUNK_SIZE):
+            chunk = rows[start:start + self.CHUNK_SIZE]
+            pending.append(self._executor.submit(function, self._terminal,
+                                                 chunk, *args))
+            if self._pending <= len(pending):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def widths(self, rows):
+        '''Generate the widths of the cells of each row'''
+        for chunk in self._map(_widths, rows):
+            for widths in chunk:
+                yield widths
+
+    def lines(self, rows, cell_widths, width):
+        '''Generate the lines of the rows using the defined column widths'''
+        for chunk in self._map(_lines, rows, cell_widths, width):
+            for line in chunk:
+                yield line
+
+    def lines_by_row(self, rows, cell_widths, width):
+        '''Generate a list of the lines of each row'''
+        for chunk in self._map(_lines_by_row, rows, cell_widths, width):
+            for lines in chunk:
+                yield lines
@@ -25,10 +25,116 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-import re
-import textwrap
+from bisect import bisect_right
+import itertools
+
+try:
+    from itertools import zip_longest
+except ImportError:
+    from itertools import izip_longest as zip_longest
 
 from flowui.widget import Widget
+from flowui.widgets.layout import ColumnWidths
+from flowui.widgets.layout import water_fill
+from flowui.wrap import BreakIndex
+
+
+def _row_lines(terminal, rows, cell_widths, width):
+    padding = ''
+    if sum(cell_widths) < width:
+        padding = '%%(face-normal)s%s' % (' ' * (width - sum(cell_widths)))
+    for row in rows:
+        for line in row.lines(terminal, cell_widths):
+            yield line + padding
+
+
+class TableLayout(object):
+    '''Layout of a table constrained to a width
+
+    Holds the width of each column and the number of lines spanned by each row
+    and by the whole table. The lines of each row are counted when first
+    needed so that rows which are never drawn, i.e. when drawing one page of a
+    large table, are not wrapped.
+
+    A layout never changes and remains valid until the table is modified. It
+    is created by Table.layout and can be passed on to the drawing methods of
+    the table so that the table is not laid out again.
+
+    '''
+    def __init__(self, table, terminal, width, column_widths, cells_height,
+                 offsets):
+        '''
+        Keyword arguments:
+        table -- the table laid out
+        terminal -- the terminal used to measure the cells
+        width -- the maximum number of characters to span per line
+        column_widths -- tuple containing the width of each column
+        cells_height -- number of lines spanned by cells not stored in rows
+        offsets -- list of the first line of the leading rows
+
+        '''
+        self._table = table
+        self._version = table.version()
+        self._terminal = terminal
+        self._width = width
+        self._column_widths = column_widths
+        self._cells_height = cells_height
+        self._offsets = offsets
+
+    def _matches(self, terminal, width):
+        return self._terminal is terminal and self._width == width
+
+    def valid(self):
+        '''Check whether the table is unmodified since it was laid out'''
+        return self._table.version() == self._version
+
+    def width(self):
+        '''Get the width the table is constrained to'''
+        return self._width
+
+    def column_widths(self):
+        '''Get a tuple containing the width of each column'''
+        return self._column_widths
+
+    def _row_offsets(self, line=None):
+        '''Get the first line of each row up to the one containing line'''
+        offsets = self._offsets
+        rows = self._table._rows
+        if len(offsets) <= len(rows):
+            assert self.valid()
+        while len(offsets) <= len(rows):
+            if line is not None and line < offsets[-1]:
+                break
+            row = rows[len(offsets) - 1]
+            offsets.append(offsets[-1] +
+                           row.height(self._terminal, self._column_widths))
+        return offsets
+
+    def row_offset(self, index):
+        '''Get the first line of the row at the specified index'''
+        assert 0 <= index <= len(self._table._rows)
+        offsets = self._offsets
+        while len(offsets) <= index:
+            self._row_offsets(offsets[-1])
+        return offsets[index]
+
+    def row_height(self, index):
+        '''Get the number of lines spanned by the row at the index'''
+        return self.row_offset(index + 1) - self.row_offset(index)
+
+    def row_heights(self):
+        '''Get a tuple containing the number of lines spanned by each row'''
+        offsets = self._row_offsets()
+        return tuple(offsets[i + 1] - offsets[i]
+                     for i in range(len(offsets) - 1))
+
+    def cells_height(self):
+        '''Get the number of lines spanned by cells not stored in rows'''
+        return self._cells_height
+
+    def height(self):
+        '''Get the number of lines spanned by the table'''
+        return self._row_offsets()[-1] + self._cells_height
 
 
 class Table(Widget):
@@ -49,158 +155,468 @@ class Table(Widget):
     lined up vertically in the table as if they all belonged to a row
     consisting of the maximum number of cells that will fit on a row.
 
+    Columns that don't fit share the width of the table. Narrow columns keep
+    their full width while the rest is split evenly, or according to the
+    weights and limits set using set_column, between the wider ones.
+
+    Large tables can be drawn one page, or range of rows, at a time. The
+    column widths and the line offset of each row are then calculated once
+    and kept until rows or cells are added, rows that are never shown are not
+    formatted.
+
+    Modified rows are tracked so that only their widths are measured again
+    when the table is laid out. Optionally the formatted rows are kept in
+    blocks of BLOCK_SIZE rows when drawn on a terminal which can record its
+    output, and only the blocks containing rows modified since are formatted
+    again.
+
+    Tables with many rows can be laid out and formatted by several worker
+    processes, or threads on free-threaded Python builds. The output is
+    identical to the serial one and written in order. Rows are then pickled
+    when sent to the worker processes. The workers are started when first
+    needed and kept until shutdown is called.
+
     '''
+    BLOCK_SIZE = 64
+
     def _max_cell_width(self, terminal):
         max_width = 0
         for cell in self._cells:
             max_width = max(max_width, cell.width(terminal))
         return max_width
 
-    def __init__(self):
+    def __init__(self, workers=None, retain=False):
+        '''
+        Keyword arguments:
+        workers -- optional number of workers used to lay out and format rows
+        retain -- keep the formatted rows to redraw only the modified ones
+
+        '''
         self._rows = []
         self._cols_per_row = 0
         self._cells = []
+        self._indices = {}
+        self._dirty = set()
+        self._widths = None
+        self._layout = None
+        self._blocks = None
+        self._columns = {}
+        self._workers = workers
+        self._pool = None
+        self._retain = retain
+
+    def tracked(self):
+        return True
+
+    def retains(self):
+        return self._retain
+
+    def set_column(self, index, minimum=None, maximum=None, weight=1):
+        '''Constrain the width of a column
+
+        Columns are as wide as their widest cell within these constraints.
+        When the columns are too wide to fit the table the width is shared
+        between them in proportion to their weights, see water_fill.
+
+        Keyword arguments:
+        index -- index of the column
+        minimum -- optional minimum width of the column
+        maximum -- optional maximum width of the column
+        weight -- share of the width given to the column relative to others
+
+        '''
+        assert 0 <= index and 0 <= weight
+        self._columns[index] = (minimum, maximum, weight)
+        self.touch()
 
     def add_cell(self, cell):
         '''Adds the cell to the table'''
         assert isinstance(cell, Cell)
         self._cells.append(cell)
+        self._adopt(cell)
+        self.touch()
 
     def add_row(self, row):
         '''Adds the row to the table'''
         assert isinstance(row, Row)
-        self._cols_per_row = max(len(row.cells()), self._cols_per_row)
+        self._fit_columns(row)
+        self._indices.setdefault(row, []).append(len(self._rows))
+        self._dirty.add(len(self._rows))
         self._rows.append(row)
-
-    def _draw_cells(self, terminal, width):
+        self._adopt(row)
+        self.touch()
+
+    def _fit_columns(self, row):
+        if self._cols_per_row < len(row.cells()):
+            self._cols_per_row = len(row.cells())
+            self._widths = None
+
+    def _child_touched(self, child):
+        if isinstance(child, Row):
+            self._fit_columns(child)
+            for index in self._indices.get(child, ()):
+                self._dirty.add(index)
+                if self._blocks is not None:
+                    self._blocks[1].pop(int(index / self.BLOCK_SIZE), None)
+        self.touch()
+
+    def _cells_per_row(self, terminal, width):
         cell_width = self._max_cell_width(terminal)
         cells_per_row = int(width / cell_width)
         assert cells_per_row
+        return (cell_width, cells_per_row)
+
+    def _cells_lines(self, terminal, width, start=0):
+        cell_width, cells_per_row = self._cells_per_row(terminal, width)
 
         cell_row_width = (cell_width * cells_per_row)
         row_padding_begin = int((width - cell_row_width) / 2)
-        row_padding_end = (width - cell_row_width - row_padding_begin)
+        begin = '%%(face-normal)s%s' % (' ' * row_padding_begin)
+        for offset in range(start * cells_per_row, len(self._cells),
+                            cells_per_row):
+            cells = self._cells[offset:offset + cells_per_row]
+            line = [begin]
+            for cell in cells:
+                line.append(next(cell.lines(terminal, cell_width)))
+            padding_end = (width - (cell_width * len(cells)) -
+                           row_padding_begin)
+            line.append('%%(face-normal)s%s' % (' ' * padding_end))
+            yield ''.join(line)
+
+    def _measure(self, terminal, rows, executor):
+        if executor is None:
+            return [[x.width(terminal) for x in row.cells()] for row in rows]
+
+        measured = list(executor.widths(rows))
+        for row, widths in zip(rows, measured):
+            for cell, width in zip(row.cells(), widths):
+                cell._width = (terminal, width)
+        return measured
+
+    def _update_widths(self, terminal, executor=None):
+        '''Measure the rows added or modified since the last update'''
+        widths = self._widths
+        if widths is None or widths[0] is not terminal:
+            widths = (terminal, ColumnWidths(self._cols_per_row))
+            self._widths = widths
+
+        cols_width = widths[1]
+        rows = cols_width.rows()
+        indices = sorted(x for x in self._dirty if x < rows)
+        indices.extend(range(rows, len(self._rows)))
+        measured = self._measure(terminal, [self._rows[x] for x in indices],
+                                 executor)
+        for index, row_widths in zip(indices, measured):
+            if index < rows:
+                cols_width.set_row(index, row_widths)
+            else:
+                cols_width.add_row(row_widths)
+        return cols_width
+
+    def _col_widths(self, terminal, width, executor=None):
+        maximums = self._update_widths(terminal, executor).maximum()
+        minimums = [min(1, x) for x in maximums]
+        weights = [1] * len(maximums)
+        for index, (minimum, maximum, weight) in self._columns.items():
+            if len(maximums) <= index:
+                continue
+            if maximum is not None:
+                maximums[index] = min(maximums[index], maximum)
+            if minimum is not None:
+                minimums[index] = minimum
+            weights[index] = weight
+        return water_fill(width, maximums, minimums, weights)
+
+    def _parallel(self):
+        return self._workers is not None and 1 < self._workers
+
+    def _executor(self, terminal):
+        if not self._parallel():
+            return None
+        if self._pool is not None:
+            if self._pool[0] is terminal:
+                return self._pool[1]
+            self.shutdown()
+
+        try:
+            from flowui.widgets import parallel
+        except ImportError:
+            return None
+        self._pool = (terminal, parallel.executor(terminal, self._workers))
+        return self._pool[1]
+
+    def shutdown(self):
+        '''Stop the workers laying out and formatting rows
+
+        The workers are started again when the table is drawn the next time.
+
+        '''
+        if self._pool is not None and self._pool[1] is not None:
+            self._pool[1].shutdown()
+        self._pool = None
+
+    def _rows_lines(self, terminal, width, layout):
+        layout = self._checked_layout(terminal, width, layout)
+        executor = self._executor(terminal)
+        if executor is not None:
+            return executor.lines(self._rows, list(layout.column_widths()),
+                                  width)
+        return _row_lines(terminal, self._rows, layout.column_widths(), width)
+
+    def layout(self, terminal, width):
+        '''Lay out the table constrained to the specified width
+
+        Returns a TableLayout which is kept and returned again until the table
+        is modified. Laying out a modified table only measures the modified
+        rows and keeps the line counts of the rows before the first modified
+        one as long as the column widths remain the same.
+
+        Keyword arguments:
+        terminal -- the output terminal
+        width -- the maximum number of characters to span per line
+
+        '''
+        layout = self._layout
+        if layout is not None and not layout._matches(terminal, width):
+            layout = None
+        if layout is not None and layout.valid():
+            return layout
+
+        column_widths = ()
+        if self._rows:
+            column_widths = tuple(self._col_widths(terminal, width,
+                                                   self._executor(terminal)))
+        offsets = [0]
+        if layout is not None and layout.column_widths() == column_widths:
+            # Rows before the first modified one keep their line offsets
+            first = min(self._dirty or [len(self._rows)])
+            offsets = layout._offsets[:first + 1]
+        self._dirty = set()
+        cells_height = 0
+        if self._cells:
+            cells_per_row = self._cells_per_row(terminal, width)[1]
+            cells_height = int((len(self._cells) + cells_per_row - 1) /
+                               cells_per_row)
+        layout = TableLayout(self, terminal, width, column_widths,
+                             cells_height, offsets)
+        self._layout = layout
+        return layout
+
+    def _checked_layout(self, terminal, width, layout):
+        if layout is None:
+            return self.layout(terminal, width)
+        assert layout._table is self and layout._matches(terminal, width)
+        assert layout.valid()
+        return layout
+
+    def height(self, terminal, width, layout=None):
+        '''Calculate the number of lines the table spans'''
+        return self._checked_layout(terminal, width, layout).height()
+
+    def pages(self, terminal, width, height=None, layout=None):
+        '''Calculate the number of pages needed to draw the table
+
+        Keyword arguments:
+        terminal -- the output terminal
+        width -- the maximum number of characters to span per line
+        height -- number of lines per page, defaults to the terminal height
+        layout -- optional layout of the table at the width
+
+        '''
+        if height is None:
+            height = terminal.height()
+        assert 0 < height
+        lines = self.height(terminal, width, layout)
+        return int((lines + height - 1) / height)
+
+    def _range_lines(self, terminal, width, start, end, layout):
+        rows = itertools.islice(self._rows, start, end)
+        return _row_lines(terminal, rows, layout.column_widths(), width)
+
+    def draw_rows(self, terminal, width, start, end=None, layout=None):
+        '''Draw the rows [start, end) of the table
+
+        Keyword arguments:
+        terminal -- the output terminal
+        width -- the maximum number of characters to span per line
+        start -- index of the first row to draw
+        end -- index after the last row to draw, defaults to the last row
+        layout -- optional layout of the table at the width
+
+        '''
+        layout = self._checked_layout(terminal, width, layout)
+        for line in self._range_lines(terminal, width, start, end, layout):
+            terminal.write('%s\n' % line)
+
+    def draw_page(self, terminal, width, page, height=None, layout=None):
+        '''Draw one page of the table
+
+        Rows which span more lines than fit on the page continue on the next
+        one.
+
+        Keyword arguments:
+        terminal -- the output terminal
+        width -- the maximum number of characters to span per line
+        page -- index of the page to draw
+        height -- number of lines per page, defaults to the terminal height
+        layout -- optional layout of the table at the width
+
+        '''
+        if height is None:
+            height = terminal.height()
+        assert 0 < height
+        layout = self._checked_layout(terminal, width, layout)
+        first = page * height
+        offsets = layout._row_offsets(first)
+        lines = []
+        cells_start = first - offsets[-1]
+        if first < offsets[-1]:
+            row = bisect_right(offsets, first) - 1
+            lines.append(itertools.islice(
+                self._range_lines(terminal, width, row, None, layout),
+                first - offsets[row], None))
+            cells_start = 0
+        if self._cells:
+            lines.append(self._cells_lines(terminal, width, cells_start))
 
-        terminal.write('%s' % ' ' * int(row_padding_begin))
-        cell_offset = 0
-        for cell in self._cells:
-            if cells_per_row <= cell_offset:
-                cell_offset = 0
-                terminal.write('%s\n%s' % (' ' * row_padding_end,
-                                           ' ' * row_padding_begin))
-
-            cell.draw(terminal, cell_width)
-            cell_offset += 1
-
-        last_row_padding = (width - (cell_width * cell_offset) -
-                            row_padding_begin)
-        terminal.write('%s\n' % (' ' * last_row_padding))
-
-    def _cols_median(self, terminal):
-        cols_width = [[0 for i in range(len(self._rows))]
-                      for j in range(self._cols_per_row)]
-        for i in range(len(self._rows)):
-            row = self._rows[i]
-            for j in range(len(row.cells())):
-                cell = row.cells()[j]
-                cols_width[j][i] = cell.width(terminal)
-
-        cols_median = [0 for i in range(len(cols_width))]
-        for i in range(len(cols_width)):
-            lst = sorted(cols_width[i])
-            length = len(lst)
-            if not length % 2:
-                neighbours_sum = (lst[int(length / 2)] +
-                                  lst[int(length / 2) - 1])
-                cols_median[i] = int(neighbours_sum / 2)
+        for line in itertools.islice(itertools.chain(*lines), height):
+            terminal.write('%s\n' % line)
 
-            else:
-                cols_median[i] = lst[int(length / 2)]
+    def lines(self, terminal, width, layout=None):
+        '''Generate the lines of the table constrained to the specified
+        width, optionally using a layout of the table at the width'''
+        lines = []
+        if self._rows:
+            lines.append(self._rows_lines(terminal, width, layout))
+        if self._cells:
+            lines.append(self._cells_lines(terminal, width))
+        return itertools.chain(*lines)
+
+    def _draw_blocks(self, terminal, width, layout):
+        cell_widths = layout.column_widths()
+        key = (terminal, width, cell_widths, terminal.format_key())
+        if self._blocks is None or self._blocks[0] != key:
+            self._blocks = (key, {})
+        blocks = self._blocks[1]
+
+        size = self.BLOCK_SIZE
+        starts = range(0, len(self._rows), size)
+        stale = set()
+        for start in starts:
+            block = blocks.get(int(start / size))
+            if block is None or block[0] != min(size, len(self._rows) - start):
+                stale.add(start)
+
+        executor = self._executor(terminal)
+        lines = None
+        if executor is not None and stale:
+            # The rows of all stale blocks are formatted by the workers at once
+            rows = []
+            for start in sorted(stale):
+                rows.extend(self._rows[start:start + size])
+            lines = executor.lines_by_row(rows, list(cell_widths), width)
+
+        for start in starts:
+            rows = self._rows[start:start + size]
+            if start not in stale:
+                terminal.replay(blocks[int(start / size)][1])
+                continue
+
+            with terminal.record() as recording:
+                if lines is None:
+                    for line in _row_lines(terminal, rows, cell_widths, width):
+                        terminal.write('%s\n' % line)
+                else:
+                    for _ in rows:
+                        for line in next(lines):
+                            terminal.write('%s\n' % line)
+            blocks[int(start / size)] = (len(rows), recording)
 
-        return cols_median
+    def draw(self, terminal, width, layout=None):
+        '''Draw the table on the specified terminal constrained to the
+        specified width, optionally using a layout of the table at the
+        width'''
+        if not self._retain or not hasattr(terminal, 'record'):
+            for line in self.lines(terminal, width, layout):
+                terminal.write('%s\n' % line)
+            return
 
-    def _cols_mean(self, terminal):
-        cols_width = [[0 for i in range(len(self._rows))]
-                      for j in range(self._cols_per_row)]
-        for i in range(len(self._rows)):
-            row = self._rows[i]
-            for j in range(len(row.cells())):
-                cell = row.cells()[j]
-                cols_width[j][i] = cell.width(terminal)
+        if self._rows:
+            self._draw_blocks(terminal, width,
+                              self._checked_layout(terminal, width, layout))
+        if self._cells:
+            for line in self._cells_lines(terminal, width):
+                terminal.write('%s\n' % line)
 
-        cols_mean = [0 for i in range(len(cols_width))]
-        for i in range(len(cols_width)):
-            cols_mean[i] = int(sum(cols_width[i]) / len(cols_width[i]))
 
-        return cols_mean
+class StreamingTable(Widget):
+    '''Streaming table widget
 
-    def _fill_widths(self, widths, wanted_widths, max_widths):
-        for i in range(len(max_widths)):
-            if widths[i] is not None:
-                continue
-            elif wanted_widths[i] <= max_widths[i]:
-                widths[i] = wanted_widths[i]
-
-        return widths
-
-    def _col_widths(self, terminal, width):
-        cell_widths = []
-        for row in self._rows:
-            cells = len(row.cells())
-            cell_widths.extend([0] * (cells - len(cell_widths)))
-
-            for i in range(len(row.cells())):
-                cell_widths[i] = max(cell_widths[i],
-                                     row.cells()[i].width(terminal))
-
-        if width < sum(cell_widths):
-            adjusted_widths = [None] * len(cell_widths)
-
-            mean_widths = [(int(width / len(cell_widths)))] * len(cell_widths)
-            adjusted_widths = self._fill_widths(adjusted_widths, cell_widths,
-                                                mean_widths)
-            mean_widths = self._cols_mean(terminal)
-            median_widths = self._cols_median(terminal)
-            if adjusted_widths.count(None):
-                left_width = width - sum([x for x in adjusted_widths
-                                          if x is not None])
-                max_cell_width = int(left_width / adjusted_widths.count(None))
-                max_widths = [min(max(mean_widths[i], median_widths[i]),
-                                  max_cell_width)
-                              for i in range(len(cell_widths))]
-                adjusted_widths = self._fill_widths(adjusted_widths,
-                                                    cell_widths, max_widths)
-
-            while adjusted_widths.count(None):
-                left_width = width - sum([x for x in adjusted_widths
-                                          if x is not None])
-                max_cell_width = int(left_width / adjusted_widths.count(None))
-                current_min = min([cell_widths[i]
-                                   for i in range(len(cell_widths))
-                                   if adjusted_widths[i] is None])
-                index = cell_widths.index(current_min)
-                adjusted_widths[index] = max_cell_width
-
-            return adjusted_widths
-
-        return cell_widths
-
-    def _draw_rows(self, terminal, width):
-        cell_widths = self._col_widths(terminal, width)
-        row_width = sum(cell_widths)
-        for row in self._rows:
-            while row is not None:
-                row = row.draw(terminal, cell_widths)
-                padding = ' ' * (width - row_width)
-                terminal.write('%s\n' % padding)
+    A table which draws rows taken from an iterable, such as a generator, one
+    at a time without storing them. The column widths are either declared up
+    front or calculated from a sample window consisting of the first rows, so
+    memory usage is bounded by the size of the window no matter how many rows
+    are drawn.
+
+    Every row must have one cell per column. A generator can only be drawn
+    once.
+
+    '''
+    DEFAULT_SAMPLE = 100
+
+    def __init__(self, rows, widths=None, sample=DEFAULT_SAMPLE):
+        '''
+        Keyword arguments:
+        rows -- iterable of rows to draw
+        widths -- optional list of column widths
+        sample -- number of rows used to calculate the column widths
+
+        '''
+        super(StreamingTable, self).__init__()
+        assert widths or 0 < sample
+        self._rows = rows
+        self._widths = widths
+        self._sample = sample
+
+    def _sample_widths(self, terminal, width, sample):
+        table = Table()
+        for row in sample:
+            table.add_row(row)
+        return table._col_widths(terminal, width)
+
+    def _checked(self, rows):
+        for row in rows:
+            assert isinstance(row, Row)
+            yield row
+
+    def _sampled(self, sample, rows):
+        sample.reverse()
+        while sample:
+            yield sample.pop()
+        for row in self._checked(rows):
+            yield row
+
+    def lines(self, terminal, width):
+        '''Generate the lines of the rows constrained to the specified
+        width'''
+        rows = iter(self._rows)
+        if self._widths:
+            cell_widths = list(self._widths)
+            rows = self._checked(rows)
+        else:
+            sample = list(itertools.islice(rows, self._sample))
+            if not sample:
+                return iter(())
+            cell_widths = self._sample_widths(terminal, width, sample)
+            rows = self._sampled(sample, rows)
+
+        return _row_lines(terminal, rows, cell_widths, width)
 
     def draw(self, terminal, width):
-        '''Draw the table on the specified terminal constrained to the
+        '''Draw the rows on the specified terminal constrained to the
         specified width'''
-        if self._rows:
-            self._draw_rows(terminal, width)
-        if self._cells:
-            self._draw_cells(terminal, width)
+        for line in self.lines(terminal, width):
+            terminal.write('%s\n' % line)
 
 
 class Row(Widget):
@@ -214,9 +630,14 @@ class Row(Widget):
         '''Returns a list of the cells stored in the row'''
         return self._cells
 
+    def tracked(self):
+        return True
+
     def add_cell(self, cell):
         '''Appends the cell to the row'''
         self._cells.append(cell)
+        self._adopt(cell)
+        self.touch()
 
     def width(self, terminal):
         '''Calculate and return the width of the row in characters'''
@@ -226,85 +647,131 @@ class Row(Widget):
         return width
 
     def draw(self, terminal, cell_widths):
-        '''Draw the row on the terminal using the defined column widths'''
+        '''Draw the row on the terminal using the defined column widths
+
+        Returns an object that draws the next line of the row in the same way
+        if any cell was wrapped onto more lines, otherwise None.
+
+        '''
+        lines = _RowLines(list(self.lines(terminal, cell_widths)))
+        return lines.draw(terminal, cell_widths)
+
+    def lines(self, terminal, cell_widths):
+        '''Generate the lines of the row using the defined column widths
+
+        The lines of every cell are generated side by side, cells which run
+        out of lines before the others are padded with whitespace.
+
+        '''
         assert len(cell_widths) == len(self._cells)
 
-        cells_rest = []
+        blanks = ['%%(face-normal)s%s' % (' ' * x) for x in cell_widths]
+        columns = [self._cells[i].lines(terminal, cell_widths[i])
+                   for i in range(len(self._cells))]
+        for line in zip_longest(*columns):
+            if None in line:
+                line = [blanks[i] if line[i] is None else line[i]
+                        for i in range(len(line))]
+            yield ''.join(line)
+
+    def height(self, terminal, cell_widths):
+        '''Calculate the number of lines the row spans using the defined
+        column widths'''
+        assert len(cell_widths) == len(self._cells)
+        height = 0
         for i in range(len(self._cells)):
-            rest = self._cells[i].draw(terminal, cell_widths[i])
-            if len(rest):
-                cells_rest.append(rest)
+            cell = self._cells[i]
+            if cell.width(terminal) <= cell_widths[i]:
+                height = max(height, 1)
             else:
-                cells_rest.append(None)
+                height = max(height, len(cell.wrap(cell_widths[i])))
+        return height
 
-        if cells_rest.count(None) < len(cells_rest):
-            row = Row()
-            for content in cells_rest:
-                if content is None:
-                    row.add_cell(Cell(''))
-                else:
-                    row.add_cell(Cell(content))
-            return row
+
+class _RowLines(object):
+    '''The remaining lines of a wrapped row'''
+
+    def __init__(self, lines):
+        self._lines = lines
+
+    def draw(self, terminal, cell_widths):
+        terminal.write(self._lines.pop(0))
+        if self._lines:
+            return self
         return None
 
 
 class Cell(Widget):
     '''A table cell'''
 
-    _format_exp = re.compile(r'(%\([^\s]+?\)s)')
-
     def __init__(self, contents=''):
         super(Cell, self).__init__()
         self._contents = ''
-        if contents:
-            self._contents = (' %s ' % contents)
+        self._width = None
+        self._index = None
+        self.set_contents(contents)
 
     def width(self, theme):
         '''Calculate and return the width in characters of the cell contents'''
-        return theme.len(self._contents)
+        if self._width is not None and self._width[0] is theme:
+            return self._width[1]
+
+        width = theme.len(self._contents)
+        self._width = (theme, width)
+        return width
 
     def contents(self):
         '''Return the contents of the cell'''
         return self._contents
 
-    def draw(self, terminal, width):
-        '''Draw the cell on the terminal constrained to the specified width'''
-        split = self._format_exp.split(self._contents)
-        contents = [[]]
-        width_left = width
-        last_format = ''
-        for item in split:
-            if self._format_exp.match(item):
-                contents[-1].append(item)
-                last_format = item
+    def tracked(self):
+        return True
 
-            else:
-                item_len = len(item.replace('%%', '%'))
-                if item_len <= width_left:
-                    contents[-1].append(item)
-                    width_left -= item_len
-
-                elif item_len < width:
-                    contents.append([last_format, item])
-                    width_left = width - item_len
-
-                elif len(item[:width_left]):
-                    first = textwrap.wrap(item[:width_left], width_left)[0]
-                    contents[-1].append(first)
-                    rest = textwrap.wrap(item[len(first):], width)
-                    for line in rest:
-                        contents.append([last_format, line])
-                    width_left = width - len(contents[-1][-1])
-
-        contents = [''.join(x) for x in contents]
-        cell_content = ''
-        if len(contents):
-            cell_content = contents[0]
-
-        line_width = terminal.len(cell_content)
-        padding = ' ' * (width - line_width)
-        terminal.write(('%(contents)s%(padding)s' %
-                        {'contents': cell_content,
-                         'padding': padding}))
-
-        return ''.join(contents[1:])
+    def __getstate__(self):
+        state = super(Cell, self).__getstate__()
+        state['_width'] = None
+        state['_index'] = None
+        return state
+
+    def set_contents(self, contents):
+        '''Replace the contents of the cell'''
+        self._contents = ''
+        if contents:
+            self._contents = (' %s ' % contents)
+        self._width = None
+        self._index = None
+        self.touch()
+
+    def wrap(self, width):
+        '''Wrap the contents into lines of at most width characters
+
+        Returns a list of tuples containing the formatted line and its width.
+
+        '''
+        if self._index is None:
+            self._index = BreakIndex(self._contents)
+        return self._index.lines(width)
+
+    def draw(self, terminal, width):
+        '''Draw the cell on the terminal constrained to the specified width
+
+        Returns the formatted contents that did not fit on the first line.
+
+        '''
+        terminal.write(next(self.lines(terminal, width)))
+        if self.width(terminal) <= width:
+            return ''
+        return self._index.rest(width)
+
+    def lines(self, terminal, width):
+        '''Generate the lines of the cell constrained to the specified width
+        '''
+        line_width = self.width(terminal)
+        if line_width <= width:
+            yield '%%(face-normal)s%s%s' % (self._contents,
+                                            ' ' * (width - line_width))
+            return
+
+        for contents, line_width in self.wrap(width):
+            yield '%%(face-normal)s%s%s' % (contents,
+                                            ' ' * (width - line_width))
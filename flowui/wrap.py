@@ -0,0 +1,191 @@
+# FlowUI text wrapping
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import re
+
+from flowui.wcwidth import _is_ascii
+from flowui.wcwidth import wcswidth
+from flowui.wcwidth import wcwidth
+
+
+class BreakIndex(object):
+    '''Index of line break opportunities in a format string
+
+    Tokenizes a string containing dictionary formatting, i.e. %(face-normal)s,
+    once into formats, whitespace and words. Lines of any width are then
+    produced in a single pass over the tokens as offsets into the string, so
+    wrapping the same contents again, or at a different width, never rescans
+    it.
+
+    Widths are measured in terminal columns. Lines are broken at whitespace,
+    which is dropped at the break. Words wider than a line are broken wherever
+    needed. Every line but the first starts with the format that was active
+    where it begins.
+
+    Byte strings containing anything but ASCII are decoded as UTF-8 so that
+    characters are measured and cut whole, and the lines are encoded again.
+
+    '''
+    FORMAT = 0
+    SPACE = 1
+    WORD = 2
+
+    CACHED_WIDTHS = 4
+
+    _token_expression = re.compile(r'(%\([^\s]+?\)s)|(\s+)|'
+                                   r'((?:%%|%(?!\([^\s]+?\)s)|[^\s%])+)')
+
+    def __init__(self, string):
+        '''
+        Keyword arguments:
+        string -- string containing optional formatting
+
+        '''
+        self._encoding = None
+        if isinstance(string, bytes) and not _is_ascii(string):
+            try:
+                string = string.decode('utf-8')
+                self._encoding = 'utf-8'
+            except UnicodeDecodeError:
+                string = string.decode('latin-1')
+                self._encoding = 'latin-1'
+
+        self._string = string
+        self._tokens = []
+        self._lines = {}
+        for match in self._token_expression.finditer(string):
+            start, end = match.span()
+            if match.group(1) is not None:
+                self._tokens.append((self.FORMAT, start, end, 0))
+            elif match.group(2) is not None:
+                width = wcswidth(match.group(2))
+                self._tokens.append((self.SPACE, start, end, width))
+            else:
+                word = match.group(3)
+                width = wcswidth(word) - word.count('%%')
+                self._tokens.append((self.WORD, start, end, width))
+
+    def _cut(self, start, end, width, force=False):
+        '''Cut the word at start after at most width columns
+
+        Returns the offset of the cut and the number of columns before it. If
+        force is set at least one character is kept even if it is too wide.
+
+        '''
+        string = self._string
+        offset = start
+        columns = 0
+        while offset < end:
+            if string.startswith('%%', offset):
+                size, char_width = (2, 1)
+            else:
+                size, char_width = (1, wcwidth(string[offset]))
+            if width < columns + char_width and (offset != start or
+                                                 not force):
+                break
+            offset += size
+            columns += char_width
+        return (offset, columns)
+
+    def lines(self, width):
+        '''Wrap the string into lines no wider than width
+
+        Returns a list of tuples containing the formatted line and its width
+        in characters. There is always at least one, possibly empty, line.
+
+        '''
+        return self._wrapped(width)[0]
+
+    def rest(self, width):
+        '''Get the formatted string remaining after the first line'''
+        return self._wrapped(width)[1]
+
+    def _wrapped(self, width):
+        wrapped = self._lines.get(width)
+        if wrapped is None:
+            if self.CACHED_WIDTHS <= len(self._lines):
+                self._lines.clear()
+            wrapped = self._lines[width] = self._wrap(max(width, 1))
+        return wrapped
+
+    def _wrap(self, width):
+        string = self._string
+        lines = []
+        active = ''
+        line = ('', 0, 0, 0)
+        broken = False
+        for kind, start, end, token_width in self._tokens:
+            prefix, line_start, line_end, line_width = line
+            if kind == self.FORMAT:
+                active = string[start:end]
+                if not broken:
+                    line = (prefix, line_start, end, line_width)
+                continue
+
+            fits = line_width + token_width <= width
+            if kind == self.SPACE:
+                if broken:
+                    continue
+                elif fits:
+                    line = (prefix, line_start, end, line_width + token_width)
+                else:
+                    broken = True
+                continue
+
+            if fits and not broken:
+                line = (prefix, line_start, end, line_width + token_width)
+                continue
+
+            if width < token_width and not broken and line_width < width:
+                cut, columns = self._cut(start, end, width - line_width)
+                token_width -= columns
+                line = (prefix, line_start, cut, line_width + columns)
+                start = cut
+
+            if line[3]:
+                lines.append(line)
+            while width < token_width:
+                cut, columns = self._cut(start, end, width, True)
+                lines.append((active, start, cut, columns))
+                token_width -= columns
+                start = cut
+
+            line = (active, start, end, token_width)
+            if start == end:
+                line = lines.pop()
+            broken = False
+
+        lines.append(line)
+        rest = ''
+        if 1 < len(lines):
+            rest = lines[1][0] + string[lines[1][1]:]
+        lines = [(prefix + string[start:end], line_width)
+                 for prefix, start, end, line_width in lines]
+        if self._encoding is not None:
+            rest = rest.encode(self._encoding)
+            lines = [(x.encode(self._encoding), y) for x, y in lines]
+        return (lines, rest)
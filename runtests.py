@@ -8,9 +8,14 @@ import unittest
 def suite():
     loader = unittest.TestLoader()
     test_suite = unittest.TestSuite()
+    test_suite.addTests(loader.loadTestsFromModule(tests.bench))
+    test_suite.addTests(loader.loadTestsFromModule(tests.imports))
+    test_suite.addTests(loader.loadTestsFromModule(tests.instrument))
     test_suite.addTests(loader.loadTestsFromModule(tests.terminals))
     test_suite.addTests(loader.loadTestsFromModule(tests.themes))
     test_suite.addTests(loader.loadTestsFromModule(tests.widgets))
+    if (3, 7) <= sys.version_info:
+        test_suite.addTests(loader.loadTestsFromModule(tests.asyncterminal))
     return test_suite
 
 
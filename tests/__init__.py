@@ -27,6 +27,17 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from tests.terminals import SysTerminalTest
+import sys
+
+from tests.bench import BenchTest
+from tests.imports import ImportTest
+from tests.instrument import InstrumentationTest
+from tests.terminals import AnsiTerminalTest, StringTerminalTest
+from tests.terminals import FanOutTerminalTest, SysTerminalTest, WcwidthTest
 from tests.themes import SolarizedTest, ZenburnTest
-from tests.widgets import WidgetsTest
+from tests.widgets import ColumnWidthsTest, StreamingTableTest, WidgetsTest
+from tests.widgets import LinesTest, PagingTest, ParallelTest, RenderCacheTest
+from tests.widgets import IncrementalTest, WaterFillTest, WrapTest
+
+if (3, 7) <= sys.version_info:
+    from tests.asyncterminal import AsyncTerminalTest
@@ -0,0 +1,98 @@
+# FlowUI asyncio terminal unit tests
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import socket
+from unittest import TestCase
+
+from flowui.terminals import AsyncTerminal
+from flowui.terminals import render
+from flowui.themes import Solarized
+from flowui.widget import Widget
+from flowui.widgets import Section
+
+
+class AsyncTerminalTest(TestCase):
+    class Lines(Widget):
+        def __init__(self, count):
+            self._count = count
+
+        def draw(self, terminal, width):
+            for line in self.lines(terminal, width):
+                terminal.write('%s\n' % line)
+
+        def lines(self, terminal, width):
+            for i in range(self._count):
+                yield '%%(face-constant)s%s' % ('%d' % i).rjust(width)
+
+    async def _connect(self, **kwargs):
+        client, server = socket.socketpair()
+        reader, self._client = await asyncio.open_connection(sock=client)
+        writer = (await asyncio.open_connection(sock=server))[1]
+        return (reader, writer, AsyncTerminal(writer, Solarized(), depth=256,
+                                              **kwargs))
+
+    def test_draw(self):
+        section = Section('async')
+        section.add_component(self.Lines(100))
+
+        async def draw():
+            reader, writer, terminal = await self._connect()
+            await terminal.draw(section, 60)
+            writer.close()
+            return await reader.read()
+
+        self.assertEqual(asyncio.run(draw()),
+                         render(section, 60, Solarized(), encoding='utf-8'))
+
+    def test_backpressure(self):
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0.001)
+
+        async def draw():
+            reader, writer, terminal = await self._connect(buffer_size=4096)
+            tick = asyncio.ensure_future(ticker())
+            task = asyncio.ensure_future(
+                terminal.draw(self.Lines(30000), 80))
+            await asyncio.sleep(0.1)
+            self.assertFalse(task.done())
+            self.assertLess(writer.transport.get_write_buffer_size(),
+                            256 * 1024)
+            self.assertGreater(len(ticks), 10)
+
+            lines = 0
+            while lines < 30000:
+                lines += (await reader.read(65536)).count(b'\n')
+            await task
+            tick.cancel()
+            writer.close()
+
+        asyncio.run(draw())
@@ -0,0 +1,97 @@
+# FlowUI benchmark tests
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from flowui import bench
+
+
+class BenchTest(TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def test_percentile(self):
+        values = [1.0, 2.0, 3.0, 4.0]
+        self.assertEqual(bench._percentile(values, 0), 1.0)
+        self.assertEqual(bench._percentile(values, 50), 2.5)
+        self.assertEqual(bench._percentile(values, 100), 4.0)
+
+    def test_measure(self):
+        benchmark = [x for x in bench.benchmarks(quick=True)
+                     if x.name == 'table/100x4/wrap25'][0]
+        result = bench.measure(benchmark, repeat=3, min_time=0)
+        self.assertEqual(result['iterations'], 3)
+        self.assertTrue(result['min'] <= result['p50'] <= result['p99'])
+        self.assertTrue(0 < result['throughput'])
+        self.assertEqual(result['unit'], 'rows')
+        if bench.tracemalloc is not None:
+            self.assertTrue(0 < result['peak_memory'])
+
+    def test_null(self):
+        terminal = bench.NullTerminal()
+        terminal.write('%(a)s\n', {'a': 'abc'})
+        self.assertEqual(terminal.written, 4)
+
+    def test_compare(self):
+        baseline = {'a': {'p50': 1.0}, 'b': {'p50': 1.0}, 'c': {'p50': 1.0}}
+        results = {'a': {'p50': 1.05}, 'b': {'p50': 1.5}, 'd': {'p50': 1.0}}
+        self.assertEqual([(x[0], x[4]) for x in bench.compare(results,
+                                                              baseline)],
+                         [('a', False), ('b', True)])
+
+    def test_main(self):
+        path = os.path.join(self._directory, 'baseline.json')
+        stream = StringIO()
+        arguments = ['--quick', '--filter', 'theme', '--repeat', '3',
+                     '--time', '0']
+        self.assertEqual(bench.main(arguments + ['--output', path], stream),
+                         0)
+        with open(path) as output:
+            results = json.load(output)['results']
+        self.assertEqual(sorted(results), ['theme/solarized', 'theme/zenburn'])
+
+        status = bench.main(arguments + ['--baseline', path,
+                                         '--threshold', '1000'], stream)
+        self.assertEqual(status, 0)
+        self.assertIn('theme/zenburn', stream.getvalue())
+
+        stream = StringIO()
+        bench.main(['--quick', '--list'], stream)
+        self.assertIn('import', stream.getvalue().split())
+        self.assertIn('import/flowui', stream.getvalue().split())
@@ -0,0 +1,64 @@
+# FlowUI import unit tests
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class ImportTest(TestCase):
+    _modules = ('import sys\n'
+                'import flowui\n'
+                'print(" ".join(sorted(m for m in sys.modules\n'
+                '                      if m.startswith("flowui"))))\n')
+
+    def _import(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, '-c',
+                                          self._modules], cwd=root)
+        return output.decode('ascii').split()
+
+    def _skip_eager(self):
+        if sys.version_info < (3, 7):
+            self.skipTest('module attributes are loaded eagerly')
+
+    def test_lazy(self):
+        self._skip_eager()
+        modules = self._import()
+        self.assertEqual(modules, ['flowui', 'flowui.lazy', 'flowui.version'])
+
+    def test_attributes(self):
+        import flowui
+        import flowui.themes
+        import flowui.widgets
+
+        self.assertTrue(issubclass(flowui.AnsiTerminal, flowui.Terminal))
+        self.assertTrue(issubclass(flowui.themes.Solarized, flowui.Theme))
+        self.assertTrue(issubclass(flowui.widgets.Table, flowui.Widget))
+        self.assertIn('Zenburn', dir(flowui.themes))
+        self.assertRaises(AttributeError, getattr, flowui.widgets, 'Missing')
@@ -0,0 +1,100 @@
+# FlowUI instrumentation tests
+#
+# Copyright (c) 2012-2013, David Holm <dholmster@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the author of FlowUI nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL DAVID HOLM BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from unittest import TestCase
+
+from flowui import AnsiTerminal
+from flowui import Instrumentation
+from flowui.themes import Solarized
+from flowui.widgets import Section
+from flowui.widgets import table
+from tests.terminals import CaptureTerminal
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        self._capture = CaptureTerminal()
+        self._terminal = AnsiTerminal(self._capture, Solarized())
+        self._section = Section('instrumented')
+        self._table = table.Table()
+        for i in range(3):
+            row = table.Row()
+            row.add_cell(table.Cell('%%(face-identifier)srow %d' % i))
+            row.add_cell(table.Cell('value %d' % i))
+            self._table.add_row(row)
+        self._section.add_component(self._table)
+
+    def test_terminals(self):
+        with Instrumentation() as instrumentation:
+            self._terminal.write('%(face-constant)sabc\n')
+            self._terminal.len('abc')
+        terminals = instrumentation.profile()['terminals']
+        self.assertEqual(sorted(terminals),
+                         ['AnsiTerminal#1', 'CaptureTerminal#2'])
+        ansi = terminals['AnsiTerminal#1']
+        self.assertEqual((ansi['writes'], ansi['bytes'], ansi['escape_bytes'],
+                          ansi['len_calls']), (1, 21, 0, 1))
+        output = ''.join(self._capture.output)
+        capture = terminals['CaptureTerminal#2']
+        self.assertEqual(capture['bytes'], len(output))
+        self.assertEqual(capture['escape_bytes'], len(output) - 4)
+
+    def test_widgets(self):
+        with Instrumentation() as instrumentation:
+            self._section.draw(self._terminal, 40)
+        widgets = instrumentation.profile()['widgets']
+        self.assertEqual(sorted(widgets),
+                         ['Section', 'Section>Table', 'Section>Table>Row',
+                          'Section>Table>Row>Cell'])
+        self.assertEqual(widgets['Section>Table>Row']['calls'], 3)
+        self.assertEqual(widgets['Section>Table>Row>Cell']['calls'], 6)
+        section = widgets['Section']
+        self.assertTrue(0 <= section['own'] <= section['time'])
+        self.assertEqual(len(instrumentation.collapsed()), 4)
+        self.assertTrue(instrumentation.collapsed()[1].startswith(
+            'Section;Table '))
+
+    def test_callback(self):
+        profiles = []
+        with Instrumentation(profiles.append):
+            list(self._table.lines(self._terminal, 40))
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]['widgets']['Table']['calls'], 1)
+
+    def test_disabled(self):
+        methods = (AnsiTerminal.__dict__['write'], table.Row.__dict__['lines'])
+        instrumentation = Instrumentation()
+        instrumentation.enable()
+        self.assertNotEqual((AnsiTerminal.__dict__['write'],
+                             table.Row.__dict__['lines']), methods)
+        self.assertRaises(AssertionError, Instrumentation().enable)
+        instrumentation.disable()
+        self.assertEqual((AnsiTerminal.__dict__['write'],
+                          table.Row.__dict__['lines']), methods)
+        self._section.draw(self._terminal, 40)
+        self.assertEqual(instrumentation.profile(),
+                         {'terminals': {}, 'widgets': {}})
@@ -25,10 +25,89 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import os
 from os import environ
+import re
+import shutil
+import signal
+import tempfile
 from unittest import TestCase
 
+from flowui import AnsiTerminal
+from flowui import RenderCache
+from flowui import Terminal
+from flowui.terminals import FanOutTerminal
+from flowui.terminals import StringTerminal
 from flowui.terminals import SysTerminal
+from flowui.terminals import render
+from flowui.themes import Solarized
+from flowui.themes import Zenburn
+from flowui.widgets import Cell
+from flowui.widgets import Row
+from flowui.widgets import Section
+from flowui.widgets import Table
+from flowui.wcwidth import wcswidth
+from flowui.wcwidth import wcwidth
+import flowui.terminals.systerminal
+
+
+def screen(output):
+    '''Interpret SGR sequences and return each character with its rendition'''
+    cells = []
+    attributes = frozenset()
+    fg = bg = None
+    expression = r'\x1b\[([\d;]*)([mb])|(.)'
+    for escape, final, char in re.findall(expression, output, re.DOTALL):
+        if char:
+            cells.append((char, attributes, fg, bg))
+            continue
+        elif final == 'b':
+            cells.extend([cells[-1]] * int(escape))
+            continue
+
+        params = [int(x) for x in escape.split(';')]
+        while params:
+            param = params.pop(0)
+            if param == 0:
+                attributes = frozenset()
+                fg = bg = None
+            elif param in (38, 48):
+                color = params[1]
+                params = params[2:]
+                if param == 38:
+                    fg = color
+                else:
+                    bg = color
+            elif 30 <= param < 38:
+                fg = param - 30
+            elif 40 <= param < 48:
+                bg = param - 40
+            else:
+                attributes |= frozenset([param])
+    return cells
+
+
+class CaptureStream(object):
+    def __init__(self):
+        self.writes = []
+        self.flushes = 0
+
+    def write(self, string):
+        self.writes.append(string)
+
+    def flush(self):
+        self.flushes += 1
+
+
+class CaptureTerminal(Terminal):
+    def __init__(self, width=80, height=25, depth=256):
+        super(CaptureTerminal, self).__init__(width, height, depth)
+        self.output = []
+
+    def write(self, string, dictionary=None):
+        if dictionary is not None:
+            string = string % dictionary
+        self.output.append(string)
 
 
 class SysTerminalTest(TestCase):
@@ -41,6 +120,73 @@ class SysTerminalTest(TestCase):
     def test_write(self):
         self._terminal.write('Test\n')
 
+    def _buffered(self, **kwds):
+        stream = CaptureStream()
+        stdout = flowui.terminals.systerminal.stdout
+        flowui.terminals.systerminal.stdout = stream
+        self.addCleanup(setattr, flowui.terminals.systerminal, 'stdout',
+                        stdout)
+        return (SysTerminal(**kwds), stream)
+
+    def test_flush_line(self):
+        terminal, stream = self._buffered(flush=SysTerminal.FLUSH_LINE)
+        terminal.write('a')
+        terminal.write('b')
+        self.assertEqual(stream.writes, [])
+        terminal.write('c\n')
+        self.assertEqual(stream.writes, ['abc\n'])
+
+    def test_flush_frame(self):
+        terminal, stream = self._buffered(flush=SysTerminal.FLUSH_FRAME)
+        with terminal.frame():
+            with terminal.frame():
+                terminal.write('a\n')
+            terminal.write('b\n')
+            self.assertEqual(stream.writes, [])
+        self.assertEqual(stream.writes, ['a\nb\n'])
+
+    def test_flush_size(self):
+        terminal, stream = self._buffered(flush=SysTerminal.FLUSH_FRAME,
+                                          buffer_size=4)
+        terminal.write('ab')
+        terminal.write('cd')
+        terminal.write('e')
+        self.assertEqual(stream.writes, ['abcd'])
+        terminal.flush()
+        self.assertEqual(stream.writes, ['abcd', 'e'])
+
+    def test_frame_unbuffered(self):
+        terminal, stream = self._buffered()
+        ansi_terminal = AnsiTerminal(terminal, Solarized())
+        with ansi_terminal.frame():
+            ansi_terminal.write('a')
+            ansi_terminal.write('b\n')
+        self.assertEqual(len(stream.writes), 1)
+        self.assertEqual(stream.flushes, 1)
+
+    def test_resize(self):
+        if not hasattr(signal, 'SIGWINCH'):
+            self.skipTest('SIGWINCH is not supported')
+
+        size = flowui.terminals.systerminal._size
+        self.addCleanup(setattr, flowui.terminals.systerminal, '_size', size)
+        flowui.terminals.systerminal._size = lambda: (123, 45)
+        self.assertEqual((self._terminal.width(), self._terminal.height()),
+                         size())
+
+        ansi_terminal = AnsiTerminal(self._terminal, Solarized())
+        os.kill(os.getpid(), signal.SIGWINCH)
+        self.assertEqual((self._terminal.width(), self._terminal.height()),
+                         (123, 45))
+        self.assertEqual((ansi_terminal.width(), ansi_terminal.height()),
+                         (123, 45))
+
+    def test_depth(self):
+        term = environ.get('TERM', '')
+        self.assertIn(term, flowui.terminals.systerminal._colors)
+        self.assertEqual(self._terminal.depth(),
+                         flowui.terminals.systerminal._depth(term))
+
     def test_dumb(self):
         term = environ['TERM']
         exception = None
@@ -54,3 +200,260 @@ class SysTerminalTest(TestCase):
         environ['TERM'] = term
         if exception is not None:
             raise exception
+
+
+class AnsiTerminalTest(TestCase):
+    def setUp(self):
+        self._capture = CaptureTerminal()
+        self._terminal = AnsiTerminal(self._capture, Solarized(),
+                                      track_sgr=False)
+        self._faces = self._terminal._faces
+
+    def test_template_cache(self):
+        string = '%(face-constant)s42%(face-normal)s %%\n'
+        self._terminal.write(string)
+        self._terminal.write(string)
+
+        expected = ('%(face-normal)s%(face-constant)s42%(face-normal)s %%'
+                    '\x1b[0m\n' % self._faces)
+        self.assertEqual(self._capture.output, [expected, expected])
+        self.assertIn(string, AnsiTerminal._templates)
+
+    def test_template_unique(self):
+        string = '%(face-constant)sunique%(face-normal)s %(x)s\n'
+        self._terminal.write(string, {'x': 1})
+        self.assertNotIn(string, AnsiTerminal._templates)
+        self._terminal.write(string, {'x': 1})
+        self.assertIn(string, AnsiTerminal._templates)
+        self.assertEqual(self._capture.output[0], self._capture.output[1])
+
+    def test_len(self):
+        self.assertEqual(self._terminal.len(''), 0)
+        self.assertEqual(self._terminal.len('%(face-type)s%(x)s?', {'x': 1}),
+                         2)
+        self.assertEqual(self._terminal.len('%(face-type)sint%%\n'), 5)
+        self.assertEqual(self._terminal.len('%(face-type)s%(x)s', {'x': 12}),
+                         2)
+        self.assertRaises(KeyError, self._terminal.len, '%(face-none)s')
+
+    def test_len_wide(self):
+        string = u'%(face-type)s\u4e2d\u6587%(face-normal)se\u0301'
+        self.assertEqual(self._terminal.len(string), 5)
+        self.assertEqual(self._terminal.len(u'%(x)s', {'x': u'\uff21'}), 2)
+        self.assertEqual(Terminal.len(self._capture, u'\u4e2d'), 2)
+
+    def test_width_cache(self):
+        string = '\tfoo%(face-identifier)s bar'
+        before = self._terminal.width_stats()
+        for _ in range(3):
+            self.assertEqual(self._terminal.len(string), 15)
+
+        stats = self._terminal.width_stats()
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 2)
+
+    def test_sgr_tracking(self):
+        terminal = AnsiTerminal(self._capture, Solarized(), track_sgr=True)
+        terminal.write('%(face-normal)sa')
+        terminal.write('b')
+        terminal.write('%(face-type)sc\n')
+        terminal.write('d')
+
+        normal = self._faces['face-normal']
+        self.assertEqual(self._capture.output,
+                         [normal + 'a', 'b', '\x1b[38;5;136mc\x1b[0m\n',
+                          normal + 'd'])
+        self.assertEqual(terminal.sgr_stats(),
+                         {'emitted': 2 * len(normal) + 11,
+                          'saved': 3 * len(normal) + 11})
+
+    def test_sgr_rendition(self):
+        strings = ['%(face-normal)sa', '%(face-comment)sb%(face-constant)sc',
+                   '%(face-constant)sd\n', 'e%(face-header)sf', 'g',
+                   '%(face-error)sh%(face-attention)si%(face-normal)sj\n']
+        for depth in (8, 16, 256):
+            tracked = CaptureTerminal(depth=depth)
+            untracked = CaptureTerminal(depth=depth)
+            terminals = [AnsiTerminal(tracked, Solarized(), track_sgr=True),
+                         AnsiTerminal(untracked, Solarized(), track_sgr=False)]
+            for string in strings:
+                for terminal in terminals:
+                    terminal.write(string)
+
+            self.assertEqual(screen(''.join(tracked.output)),
+                             screen(''.join(untracked.output)))
+            self.assertLess(len(''.join(tracked.output)),
+                            len(''.join(untracked.output)))
+
+    def test_compress_padding(self):
+        terminal = AnsiTerminal(self._capture, Solarized(),
+                                compress_padding=True)
+        terminal.write('a%sb%sc    d\n' % (' ' * 20, ' ' * 100))
+        self.assertEqual(self._capture.output[0],
+                         self._faces['face-normal'] +
+                         'a \x1b[19bb \x1b[99bc    d\x1b[0m\n')
+
+        tbl = Table()
+        for i in range(10):
+            row = Row()
+            row.add_cell(Cell('%%(face-constant)s%d' % i))
+            row.add_cell(Cell('cell %d' % (i * 1000)))
+            tbl.add_row(row)
+
+        plain = CaptureTerminal()
+        tbl.draw(AnsiTerminal(plain, Solarized(), track_sgr=True), 120)
+        compressed = CaptureTerminal()
+        tbl.draw(AnsiTerminal(compressed, Solarized(), track_sgr=True,
+                              compress_padding=True), 120)
+        self.assertEqual(screen(''.join(compressed.output)),
+                         screen(''.join(plain.output)))
+        self.assertLess(len(''.join(compressed.output)),
+                        len(''.join(plain.output)) / 2)
+
+    def test_face_table(self):
+        terminal = AnsiTerminal(CaptureTerminal(), Solarized())
+        self.assertIs(terminal._table, self._terminal._table)
+
+        table = self._terminal._table
+        face_id = table.ids['face-normal']
+        self.assertEqual(table.escape(face_id), self._faces['face-normal'])
+        self.assertEqual(table.escape('face-normal'), table.escapes[face_id])
+
+        terminal.set_theme(Zenburn())
+        self.assertEqual(terminal._table.theme,
+                         'flowui.themes.zenburn.Zenburn')
+        self.assertIs(terminal._table, AnsiTerminal.face_table(Zenburn(), 256))
+
+    def test_face_table_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'solarized.json')
+        self._terminal._table.save(path)
+
+        tables = dict(AnsiTerminal._face_tables)
+        self.addCleanup(setattr, AnsiTerminal, '_face_tables', tables)
+        AnsiTerminal._face_tables = {}
+        table = AnsiTerminal.load_face_table(path)
+        self.assertEqual(table.faces, self._faces)
+        self.assertIs(AnsiTerminal(CaptureTerminal(), Solarized())._table,
+                      table)
+
+    def test_dictionary(self):
+        self._terminal.write('%(face-type)s%(name)s', {'name': 'int'})
+        self._terminal.write('%(face-type)s')
+
+        self.assertEqual(self._capture.output[1],
+                         '%(face-normal)s%(face-type)s' % self._faces)
+        self.assertNotIn('name', self._faces)
+
+
+class FanOutTerminalTest(TestCase):
+    def _section(self):
+        tbl = Table()
+        for i in range(10):
+            row = Row()
+            row.add_cell(Cell('%%(face-identifier)srow %d' % i))
+            row.add_cell(Cell('%%(face-constant)s%d%%(face-normal)s %%%%' % i))
+            tbl.add_row(row)
+        section = Section('fan-out')
+        section.add_component(tbl)
+        return section
+
+    def test_write(self):
+        sinks = [CaptureTerminal(depth=256), CaptureTerminal(depth=8),
+                 CaptureTerminal(depth=256)]
+        terminal = FanOutTerminal(sinks, Solarized())
+        self._section().draw(terminal, 60)
+        terminal.reset()
+
+        for sink in sinks:
+            expected = CaptureTerminal(depth=sink.depth())
+            ansi_terminal = AnsiTerminal(expected, Solarized())
+            self._section().draw(ansi_terminal, 60)
+            ansi_terminal.reset()
+            self.assertEqual(sink.output, expected.output)
+
+        self.assertNotEqual(sinks[0].output, sinks[1].output)
+        for i in range(len(sinks[0].output)):
+            self.assertTrue(sinks[0].output[i] is sinks[2].output[i])
+
+    def test_replay(self):
+        sinks = [CaptureTerminal(depth=256), CaptureTerminal(depth=8)]
+        terminal = FanOutTerminal(sinks, Solarized())
+        section = self._section()
+        cache = RenderCache()
+        cache.draw(section, terminal, 60)
+        expected = [screen(''.join(x.output)) for x in sinks]
+        for sink in sinks:
+            sink.output = []
+
+        cache.draw(section, terminal, 60)
+        self.assertEqual([screen(''.join(x.output)) for x in sinks], expected)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_frame(self):
+        buffered = StringTerminal()
+        flushed = []
+        buffered.flush = lambda: flushed.append(buffered.getvalue())
+        terminal = FanOutTerminal([buffered, CaptureTerminal()], Solarized())
+        self.assertEqual(terminal.width(), Terminal.DEFAULT_WIDTH)
+        self.assertEqual(terminal.depth(), 256)
+        with terminal.frame():
+            terminal.write('a')
+            with terminal.frame():
+                terminal.write('b\n')
+            self.assertEqual(flushed, [])
+        self.assertEqual(len(flushed), 1)
+        self.assertEqual(terminal.len('%(face-type)sab'), 2)
+
+
+class WcwidthTest(TestCase):
+    def test_wcwidth(self):
+        self.assertEqual(wcwidth(u'a'), 1)
+        self.assertEqual(wcwidth(u'\u00e9'), 1)
+        self.assertEqual(wcwidth(u'\u4e2d'), 2)
+        self.assertEqual(wcwidth(u'\uac00'), 2)
+        self.assertEqual(wcwidth(u'\uff21'), 2)
+        self.assertEqual(wcwidth(u'\u0301'), 0)
+        self.assertEqual(wcwidth(u'\u200b'), 0)
+        self.assertEqual(wcwidth(u'\u00ad'), 1)
+
+    def test_wcswidth(self):
+        self.assertEqual(wcswidth(''), 0)
+        self.assertEqual(wcswidth('cell 1,2'), 8)
+        self.assertEqual(wcswidth(u'\u4e2d\u6587 ok'), 7)
+        self.assertEqual(wcswidth(u'\u4e2d'.encode('utf-8')), 2)
+        self.assertEqual(wcswidth(u'Cafe\u0301'), 4)
+
+
+class StringTerminalTest(TestCase):
+    def test_write(self):
+        terminal = StringTerminal()
+        terminal.write('a')
+        terminal.write('%(b)s', {'b': 'b'})
+        self.assertEqual(terminal.getvalue(), 'ab')
+        terminal.write('c')
+        self.assertEqual(terminal.getvalue(), 'abc')
+
+        terminal.clear()
+        self.assertEqual(terminal.getvalue(), '')
+
+    def test_render(self):
+        section = Section('render')
+        capture = CaptureTerminal(depth=256)
+        section.draw(AnsiTerminal(capture, Solarized()), 40)
+
+        output = render(section, 40, Solarized())
+        self.assertEqual(output, ''.join(capture.output))
+        self.assertEqual(render(section, 40, Solarized(), encoding='utf-8'),
+                         output.encode('utf-8'))
+
+    def test_render_bytes(self):
+        tbl = Table()
+        row = Row()
+        row.add_cell(Cell(u'caf\xe9'.encode('utf-8') if str is bytes
+                          else u'caf\xe9'))
+        tbl.add_row(row)
+        for encoding in ('utf-8', 'latin-1'):
+            output = render(tbl, 20, Solarized(), encoding=encoding)
+            self.assertIn(u' caf\xe9 '.encode(encoding), output)
@@ -28,10 +28,20 @@
 from unittest import TestCase
 
 from flowui import AnsiTerminal
+from flowui import RenderCache
+from flowui import Widget
 from flowui.terminals import SysTerminal
 from flowui.themes import Solarized
+from flowui.themes import Zenburn
+from flowui.widgets import Cached
 from flowui.widgets import Section
+from tests.terminals import CaptureTerminal
+from tests.terminals import screen
 from flowui.widgets import table
+from flowui.widgets import StreamingTable
+from flowui.widgets.layout import ColumnWidths
+from flowui.widgets.layout import water_fill
+from flowui.wrap import BreakIndex
 
 
 class WidgetsTest(TestCase):
@@ -78,6 +88,14 @@ class WidgetsTest(TestCase):
         tbl.add_row(row)
         tbl.draw(self._terminal, row_len)
 
+    def test_cell_width_cache(self):
+        cell = table.Cell('cached')
+        self.assertEqual(cell.width(self._terminal), 8)
+        self.assertEqual(cell.width(self._terminal), 8)
+
+        cell.set_contents('longer contents')
+        self.assertEqual(cell.width(self._terminal), 17)
+
     def test_tables_rows(self):
         tbl = table.Table()
         for i in range(0, 5):
@@ -120,3 +138,665 @@ class WidgetsTest(TestCase):
             tbl.add_row(row)
 
         tbl.draw(self._terminal, self._terminal.width())
+
+
+class WrapTest(TestCase):
+    _contents = (' %(face-identifier)slorem ipsum%(face-normal)s dolor sit '
+                 'amet supercalifragilisticexpialidocious 100%% ')
+
+    def test_lines(self):
+        index = BreakIndex(self._contents)
+        self.assertEqual(index.lines(12),
+                         [(' %(face-identifier)slorem ipsum'
+                           '%(face-normal)s', 12),
+                          ('%(face-normal)sdolor sit ', 10),
+                          ('%(face-normal)samet superca', 12),
+                          ('%(face-normal)slifragilisti', 12),
+                          ('%(face-normal)scexpialidoci', 12),
+                          ('%(face-normal)sous 100%% ', 9)])
+        self.assertEqual(index.lines(80), [(self._contents, 68)])
+        self.assertEqual(BreakIndex('').lines(10), [('', 0)])
+
+    def test_rest(self):
+        index = BreakIndex(self._contents)
+        self.assertEqual(index.rest(12),
+                         '%(face-normal)s' + self._contents[47:])
+        self.assertEqual(index.rest(80), '')
+
+    def test_reuse(self):
+        index = BreakIndex(self._contents)
+        tokens = index._tokens
+        for width in range(1, 70):
+            for line, line_width in index.lines(width):
+                self.assertTrue(line_width <= width)
+            self.assertTrue(index.lines(width) is index.lines(width))
+        self.assertTrue(index._tokens is tokens)
+
+    def test_wide(self):
+        index = BreakIndex(u'\u4e2d\u6587\u5b57 ab\u0301c')
+        self.assertEqual(index.lines(5), [(u'\u4e2d\u6587', 4),
+                                          (u'\u5b57 ', 3),
+                                          (u'ab\u0301c', 3)])
+        self.assertEqual(index.lines(1), [(u'\u4e2d', 2), (u'\u6587', 2),
+                                          (u'\u5b57', 2), (u'a', 1),
+                                          (u'b\u0301', 1), (u'c', 1)])
+
+    def test_bytes(self):
+        contents = u'caf\xe9 \u4e2d\u6587'.encode('utf-8')
+        index = BreakIndex(contents)
+        self.assertEqual(index.lines(3), [(b'caf', 3),
+                                          (u'\xe9 '.encode('utf-8'), 2),
+                                          (u'\u4e2d'.encode('utf-8'), 2),
+                                          (u'\u6587'.encode('utf-8'), 2)])
+        self.assertEqual(index.lines(4), [(u'caf\xe9'.encode('utf-8'), 4),
+                                          (u'\u4e2d\u6587'.encode('utf-8'),
+                                           4)])
+
+        if str is not bytes:
+            return
+        capture = CaptureTerminal()
+        terminal = AnsiTerminal(capture, Solarized())
+        row = table.Row()
+        row.add_cell(table.Cell('caf\xc3\xa9' * 20))
+        row.add_cell(table.Cell('x' * 30))
+        tbl = table.Table()
+        tbl.add_row(row)
+        tbl.draw(terminal, 40)
+        output = ''.join(capture.output).split('\n')[:-1]
+        self.assertEqual(len(output), 5)
+        for line in output:
+            self.assertEqual(terminal._visible_len(line), 40)
+
+    def test_draw(self):
+        drawn = CaptureTerminal()
+        expected = CaptureTerminal()
+        terminal = AnsiTerminal(drawn, Solarized())
+        lines = AnsiTerminal(expected, Solarized())
+
+        cell = table.Cell(self._contents.strip())
+        self.assertEqual(cell.draw(terminal, 13),
+                         '%(face-normal)s' + self._contents[47:])
+        self.assertEqual(table.Cell('short').draw(terminal, 13), '')
+        lines.write(next(cell.lines(lines, 13)))
+        lines.write(next(table.Cell('short').lines(lines, 13)))
+
+        row = table.Row()
+        row.add_cell(cell)
+        row.add_cell(table.Cell('x'))
+        line = row.draw(terminal, [13, 4])
+        while line is not None:
+            line = line.draw(terminal, [13, 4])
+        for line in row.lines(lines, [13, 4]):
+            lines.write(line)
+        self.assertEqual(drawn.output, expected.output)
+        self.assertEqual(len(drawn.output), 8)
+
+    def test_row(self):
+        capture = CaptureTerminal()
+        terminal = AnsiTerminal(capture, Solarized())
+        row = table.Row()
+        for contents in [u'\u4e2d\u6587', self._contents, 'x' * 30]:
+            row.add_cell(table.Cell(contents))
+
+        tbl = table.Table()
+        tbl.add_row(row)
+        tbl.draw(terminal, 40)
+        output = ''.join(capture.output).split('\n')[:-1]
+        self.assertTrue(len(output) > 1)
+        for line in output:
+            self.assertEqual(terminal._visible_len(line), 40)
+
+
+class LinesTest(TestCase):
+    class Formatted(Widget):
+        def draw(self, terminal, width):
+            terminal.write('%(face-type)s%(n)s%%\n', {'n': '5%'})
+            terminal.write('%s\n' % ('-' * width))
+
+    def setUp(self):
+        self._capture = CaptureTerminal()
+        self._terminal = AnsiTerminal(self._capture, Solarized())
+
+    def _table(self):
+        tbl = table.Table()
+        for i in range(5):
+            row = table.Row()
+            row.add_cell(table.Cell('%%(face-identifier)srow %d' % i))
+            row.add_cell(table.Cell('lorem ipsum dolor sit amet ' * i))
+            tbl.add_row(row)
+            tbl.add_cell(table.Cell('cell %d' % i))
+        return tbl
+
+    def _screen(self, lines):
+        terminal = AnsiTerminal(CaptureTerminal(), Solarized())
+        for line in lines:
+            terminal.write('%s\n' % line)
+        return screen(''.join(terminal._terminal.output))
+
+    def test_default(self):
+        lines = self.Formatted().lines(self._terminal, 4)
+        self.assertEqual(list(lines), ['%(face-type)s5%%%%', '----'])
+
+    def test_row(self):
+        row = self._table()._rows[4]
+        lines = list(row.lines(self._terminal, [8, 30]))
+        self.assertEqual(len(lines), 4)
+        for line in lines:
+            self.assertEqual(self._terminal.len(line), 38)
+
+    def test_table(self):
+        tbl = self._table()
+        lines = list(tbl.lines(self._terminal, 40))
+        for line in lines:
+            self.assertEqual(self._terminal.len(line), 40)
+
+        tbl.draw(self._terminal, 40)
+        self.assertEqual(screen(''.join(self._capture.output)),
+                         self._screen(lines))
+
+    def test_section(self):
+        section = Section('lines')
+        section.add_component(self._table())
+        section.add_component(self.Formatted())
+        lines = list(section.lines(self._terminal, 60))
+        self.assertEqual(lines[0], '%(face-header)s' + '-' * 50 + '[lines]')
+
+        section.draw(self._terminal, 60)
+        self.assertEqual(screen(''.join(self._capture.output)),
+                         self._screen(lines))
+
+
+class PagingTest(TestCase):
+    def setUp(self):
+        self._capture = CaptureTerminal(height=7)
+        self._terminal = AnsiTerminal(self._capture, Solarized())
+        self._table = table.Table()
+        for i in range(30):
+            row = table.Row()
+            row.add_cell(table.Cell('row %d' % i))
+            row.add_cell(table.Cell('word ' * (i % 5 * 3)))
+            self._table.add_row(row)
+        for i in range(7):
+            self._table.add_cell(table.Cell('cell %d' % i))
+
+    def _output(self):
+        output = ''.join(self._capture.output)
+        self._capture.output = []
+        return output
+
+    def test_pages(self):
+        self._table.draw(self._terminal, 30)
+        lines = self._output().count('\n')
+        self.assertEqual(self._table.height(self._terminal, 30), lines)
+        self.assertEqual(self._table.pages(self._terminal, 30),
+                         int((lines + 6) / 7))
+        self.assertEqual(self._table.pages(self._terminal, 30, lines), 1)
+        self.assertEqual(table.Table().pages(self._terminal, 30), 0)
+
+    def test_draw_page(self):
+        self._table.draw(self._terminal, 30)
+        expected = screen(self._output())
+
+        pages = []
+        for page in range(self._table.pages(self._terminal, 30)):
+            self._table.draw_page(self._terminal, 30, page)
+            pages.append(self._output())
+            self.assertTrue(pages[-1].count('\n') <= 7)
+        self.assertEqual(screen(''.join(pages)), expected)
+
+    def test_draw_rows(self):
+        self._table.draw(self._terminal, 30)
+        lines = self._output().split('\n')
+
+        self._table.draw_rows(self._terminal, 30, 2, 4)
+        heights = self._table.layout(self._terminal, 30).row_heights()[:4]
+        expected = '\n'.join(lines[sum(heights[:2]):sum(heights)]) + '\n'
+        self.assertEqual(screen(self._output()), screen(expected))
+
+    def test_lazy(self):
+        for i in range(1000):
+            row = table.Row()
+            row.add_cell(table.Cell('row %d' % i))
+            row.add_cell(table.Cell('word'))
+            self._table.add_row(row)
+        self._table.draw_page(self._terminal, 30, 1)
+        self.assertEqual(self._output().count('\n'), 7)
+        layout = self._table.layout(self._terminal, 30)
+        self.assertTrue(len(layout._offsets) < 20)
+
+    def test_layout(self):
+        layout = self._table.layout(self._terminal, 30)
+        self.assertIs(self._table.layout(self._terminal, 30), layout)
+        self.assertEqual(layout.width(), 30)
+        self.assertTrue(sum(layout.column_widths()) <= 30)
+        heights = layout.row_heights()
+        self.assertEqual(len(heights), len(self._table._rows))
+        self.assertEqual(layout.height(),
+                         sum(heights) + layout.cells_height())
+        self.assertEqual(layout.row_height(3), heights[3])
+        self.assertEqual(layout.row_offset(3), sum(heights[:3]))
+
+        self._table.draw(self._terminal, 30)
+        expected = self._output()
+        self._table.draw(self._terminal, 30, layout)
+        self.assertEqual(self._output(), expected)
+        self.assertEqual(self._table.pages(self._terminal, 30, 5, layout),
+                         int((layout.height() + 4) / 5))
+
+        self._table._rows[0].cells()[0].set_contents('modified')
+        self.assertFalse(layout.valid())
+        self.assertRaises(AssertionError, self._table.draw, self._terminal,
+                          30, layout)
+        self.assertIsNot(self._table.layout(self._terminal, 30), layout)
+
+
+class ParallelTest(TestCase):
+    def setUp(self):
+        try:
+            from flowui.widgets import parallel
+        except ImportError:
+            self.skipTest('concurrent.futures is not available')
+
+        self._parallel = parallel
+        self._free_threaded = parallel._free_threaded
+        self._chunk_size = parallel.Executor.CHUNK_SIZE
+        parallel.Executor.CHUNK_SIZE = 16
+
+    def tearDown(self):
+        self._parallel._free_threaded = self._free_threaded
+        self._parallel.Executor.CHUNK_SIZE = self._chunk_size
+
+    def _table(self, workers, retain=False):
+        tbl = table.Table(workers, retain)
+        for i in range(100):
+            row = table.Row()
+            row.add_cell(table.Cell('%%(face-identifier)srow %d' % i))
+            row.add_cell(table.Cell('lorem ipsum dolor ' * (i % 7)))
+            row.add_cell(table.Cell(u'\u4e2d' * (i % 3)))
+            tbl.add_row(row)
+        return tbl
+
+    def _draw(self, workers, retain=False):
+        tbl = self._table(workers, retain)
+        capture = CaptureTerminal()
+        tbl.draw(AnsiTerminal(capture, Solarized()), 60)
+        tbl.shutdown()
+        return ''.join(capture.output)
+
+    def test_processes(self):
+        self.assertEqual(self._draw(2), self._draw(None))
+
+    def test_threads(self):
+        self._parallel._free_threaded = lambda: True
+        self.assertEqual(self._draw(2), self._draw(None))
+
+    def test_retain(self):
+        self.assertEqual(self._draw(2, True), self._draw(None))
+
+    def test_redraw(self):
+        self._parallel._free_threaded = lambda: True
+        tbl = self._table(2, True)
+        terminal = AnsiTerminal(CaptureTerminal(), Solarized())
+        tbl.draw(terminal, 60)
+        executor = tbl._pool[1]
+        measured = []
+        widths = executor.widths
+        executor.widths = lambda rows: measured.append(len(rows)) or \
+            widths(rows)
+
+        tbl._rows[3].cells()[0].set_contents('modified')
+        tbl.draw(terminal, 60)
+        self.assertIs(tbl._pool[1], executor)
+        self.assertEqual(measured, [1])
+
+        layout = tbl.layout(terminal, 60)
+        tbl._rows[4].cells()[0].set_contents('modified')
+        self.assertRaises(AssertionError, tbl.lines, terminal, 60, layout)
+        tbl.shutdown()
+        self.assertIs(tbl._pool, None)
+
+    def test_unsupported(self):
+        self.assertEqual(self._parallel.executor(CaptureTerminal(), 2), None)
+
+
+class RenderCacheTest(TestCase):
+    class Counted(Widget):
+        def __init__(self):
+            self.draws = 0
+
+        def tracked(self):
+            return True
+
+        def draw(self, terminal, width):
+            self.draws += 1
+            terminal.write('%%(face-type)s%d%%%%%s\n' % (self.version(),
+                                                         '-' * width))
+
+    def setUp(self):
+        self._capture = CaptureTerminal()
+        self._terminal = AnsiTerminal(self._capture, Solarized())
+        self._cache = RenderCache()
+
+    def _output(self):
+        output = ''.join(self._capture.output)
+        self._capture.output = []
+        return output
+
+    def test_hit(self):
+        widget = self.Counted()
+        self._cache.draw(widget, self._terminal, 10)
+        expected = self._output()
+        self._cache.draw(widget, self._terminal, 10)
+        self.assertEqual(self._output(), expected)
+        self.assertEqual(widget.draws, 1)
+        self.assertEqual(self._cache.stats(),
+                         {'hits': 1, 'misses': 1, 'entries': 1})
+
+    def test_key(self):
+        widget = self.Counted()
+        self._cache.draw(widget, self._terminal, 10)
+        self._cache.draw(widget, self._terminal, 11)
+        self._cache.draw(widget, AnsiTerminal(self._capture, Zenburn()), 10)
+        self._cache.draw(widget, AnsiTerminal(CaptureTerminal(depth=8),
+                                              Solarized()), 10)
+        widget.touch()
+        self._cache.draw(widget, self._terminal, 10)
+        self.assertEqual(widget.draws, 5)
+        self.assertIn('1%-', self._output())
+
+        cell = table.Cell('cell')
+        version = cell.version()
+        cell.set_contents('modified')
+        self.assertNotEqual(cell.version(), version)
+
+    def test_eviction(self):
+        cache = RenderCache(2)
+        widgets = [self.Counted() for _ in range(3)]
+        for widget in widgets + widgets[-1:]:
+            cache.draw(widget, self._terminal, 10)
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertEqual([x.draws for x in widgets], [1, 1, 1])
+
+    def test_uncached(self):
+        widget = self.Counted()
+        for _ in range(2):
+            self._cache.draw(widget, self._capture, 10)
+        self.assertEqual(widget.draws, 2)
+
+    def test_untracked(self):
+        class Text(Widget):
+            text = 'a'
+
+            def draw(self, terminal, width):
+                terminal.write('%s\n' % self.text)
+
+        widget = Text()
+        cached = Cached(widget, self._cache)
+        self.assertFalse(cached.tracked())
+        cached.draw(self._terminal, 10)
+        widget.text = 'b'
+        cached.draw(self._terminal, 10)
+        self.assertEqual(''.join(x[0] for x in screen(self._output())),
+                         'a\nb\n')
+        self.assertEqual(self._cache.stats()['entries'], 0)
+
+    def test_section(self):
+        tbl = table.Table()
+        for i in range(5):
+            row = table.Row()
+            row.add_cell(table.Cell('%%(face-identifier)srow %d' % i))
+            row.add_cell(table.Cell('value %d' % i))
+            tbl.add_row(row)
+        section = Section('cached')
+        section.add_component(Cached(tbl, self._cache))
+        section.draw(self._terminal, 40)
+        expected = screen(self._output())
+
+        self._terminal.write('%(face-constant)s')
+        section.draw(self._terminal, 40)
+        self.assertEqual(screen(self._output()), expected)
+        self.assertEqual(self._cache.stats()['misses'], 1)
+
+
+class IncrementalTest(TestCase):
+    class Counted(Widget):
+        def __init__(self, tracked=True):
+            self.draws = 0
+            self._tracked = tracked
+
+        def tracked(self):
+            return self._tracked
+
+        def draw(self, terminal, width):
+            self.draws += 1
+            terminal.write('%%(face-type)s%d\n' % self.version())
+
+    class CountedRow(table.Row):
+        lines_count = 0
+
+        def lines(self, terminal, cell_widths):
+            IncrementalTest.CountedRow.lines_count += 1
+            return super(IncrementalTest.CountedRow, self).lines(terminal,
+                                                                 cell_widths)
+
+    def setUp(self):
+        self._capture = CaptureTerminal()
+        self._terminal = AnsiTerminal(self._capture, Solarized())
+
+    def _output(self):
+        output = ''.join(self._capture.output)
+        self._capture.output = []
+        return output
+
+    def _text(self):
+        return ''.join(x[0] for x in screen(self._output()))
+
+    def _table(self, rows, row_class=table.Row, retain=True):
+        tbl = table.Table(retain=retain)
+        for i in range(rows):
+            row = row_class()
+            row.add_cell(table.Cell('%%(face-identifier)srow %d' % i))
+            row.add_cell(table.Cell('value %d' % (i * i)))
+            tbl.add_row(row)
+        return tbl
+
+    def test_touch(self):
+        tbl = self._table(3)
+        section = Section('touch')
+        section.add_component(tbl)
+        versions = (section.version(), tbl.version(), tbl._rows[1].version())
+        tbl._rows[1].cells()[0].set_contents('modified')
+        self.assertTrue(all(x < y for x, y in
+                            zip(versions, (section.version(), tbl.version(),
+                                           tbl._rows[1].version()))))
+        self.assertTrue(section.tracked())
+
+    def test_section(self):
+        widgets = [self.Counted(), self.Counted(), self.Counted(False)]
+        section = Section('incremental', retain=True)
+        for widget in widgets:
+            section.add_component(widget)
+        section.draw(self._terminal, 40)
+        expected = screen(self._output())
+
+        section.draw(self._terminal, 40)
+        self.assertEqual(screen(self._output()), expected)
+        self.assertEqual([x.draws for x in widgets], [1, 1, 2])
+
+        widgets[1].touch()
+        section.draw(self._terminal, 40)
+        self.assertEqual(self._text().split('\n')[1:4], ['0', '1', '0'])
+        self.assertEqual([x.draws for x in widgets], [1, 2, 3])
+        self.assertFalse(section.tracked())
+
+    def test_table(self):
+        rows = table.Table.BLOCK_SIZE * 4
+        tbl = self._table(rows, self.CountedRow)
+        tbl.draw(self._terminal, 60)
+        self._output()
+        self.assertEqual(self.CountedRow.lines_count, rows)
+
+        tbl._rows[70].cells()[1].set_contents('changed')
+        tbl.add_row(self.CountedRow())
+        tbl._rows[-1].add_cell(table.Cell('last'))
+        tbl._rows[-1].add_cell(table.Cell('row'))
+        self.CountedRow.lines_count = 0
+        tbl.draw(self._terminal, 60)
+        output = self._output()
+        self.assertEqual(self.CountedRow.lines_count,
+                         table.Table.BLOCK_SIZE + 1)
+
+        expected = self._table(rows, retain=False)
+        expected._rows[70].cells()[1].set_contents('changed')
+        row = table.Row()
+        row.add_cell(table.Cell('last'))
+        row.add_cell(table.Cell('row'))
+        expected.add_row(row)
+        expected.draw(self._terminal, 60)
+        self.assertEqual(screen(output), screen(self._output()))
+        self.assertEqual(tbl.height(self._terminal, 60), rows + 1)
+
+    def test_retain(self):
+        tbl = self._table(3, retain=False)
+        section = Section('retain', retain=True)
+        for component in (tbl, Cached(self._table(3)), self._table(3)):
+            section.add_component(component)
+        for _ in range(2):
+            section.draw(self._terminal, 40)
+        self.assertEqual(list(section._outputs), [0])
+        self.assertIs(tbl._blocks, None)
+        self.assertEqual(len(section._components[2]._blocks[1]), 1)
+
+        section = Section('retain')
+        section.add_component(tbl)
+        section.draw(self._terminal, 40)
+        self.assertEqual(section._outputs, {})
+        self.assertIs(tbl._blocks, None)
+
+    def test_widths(self):
+        tbl = self._table(4)
+        tbl.draw(self._terminal, 40)
+        self._output()
+        tbl._rows[2].cells()[1].set_contents('x' * 30)
+        tbl.draw(self._terminal, 40)
+        self.assertIn(' ' + 'x' * 30 + ' ', self._text())
+        self.assertEqual(tbl.height(self._terminal, 40), 4)
+
+
+class StreamingTableTest(TestCase):
+    def setUp(self):
+        self._capture = CaptureTerminal()
+        self._terminal = AnsiTerminal(self._capture, Solarized())
+
+    def _rows(self, count):
+        for i in range(count):
+            row = table.Row()
+            for j in range(3):
+                row.add_cell(table.Cell('cell %d,%d' % (i, j * i)))
+            yield row
+
+    def _output(self):
+        output = ''.join(self._capture.output)
+        self._capture.output = []
+        return output
+
+    def test_sample(self):
+        tbl = table.Table()
+        for row in self._rows(20):
+            tbl.add_row(row)
+        tbl.draw(self._terminal, 60)
+        expected = self._output()
+
+        StreamingTable(self._rows(20)).draw(self._terminal, 60)
+        self.assertEqual(self._output(), expected)
+
+    def test_widths(self):
+        drawn = []
+
+        def rows():
+            for row in self._rows(1000):
+                drawn.append(len(self._capture.output))
+                yield row
+
+        StreamingTable(rows(), widths=[14, 14, 14]).draw(self._terminal, 50)
+        self.assertEqual(drawn[:2], [0, 1])
+        self.assertEqual(self._output().count('\n'), 1000)
+
+    def test_empty(self):
+        StreamingTable([]).draw(self._terminal, 50)
+        self.assertEqual(self._output(), '')
+
+
+class WaterFillTest(TestCase):
+    def test_fit(self):
+        self.assertEqual(water_fill(20, [3, 5, 7]), [3, 5, 7])
+        self.assertEqual(water_fill(20, [3, 5, 7], [4, 0, 0]), [4, 5, 7])
+
+    def test_fill(self):
+        self.assertEqual(water_fill(10, [3, 20, 20]), [3, 4, 3])
+        self.assertEqual(water_fill(10, [5, 5, 5]), [4, 3, 3])
+        self.assertEqual(water_fill(10, [3, 20, 20], weights=[1, 1, 3]),
+                         [2, 2, 6])
+        self.assertEqual(water_fill(10, [10, 10], [2, 2], [1, 0]), [8, 2])
+        self.assertEqual(water_fill(5, [10, 10], [4, 4]), [4, 4])
+
+    def test_columns(self):
+        maximums = [(i * 37) % 101 + 1 for i in range(500)]
+        widths = water_fill(2000, maximums)
+        self.assertEqual(sum(widths), 2000)
+        self.assertEqual(widths, water_fill(2000, maximums))
+        level = max(widths)
+        self.assertTrue(all(x == y or level - 1 <= x
+                            for x, y in zip(widths, maximums)))
+
+        widths = water_fill(1000, [50] * 300)
+        self.assertEqual(widths, [4] * 100 + [3] * 200)
+
+    def test_table(self):
+        tbl = table.Table()
+        for i in range(4):
+            row = table.Row()
+            for j in range(3):
+                row.add_cell(table.Cell('x' * (10 + i * j)))
+            tbl.add_row(row)
+        terminal = CaptureTerminal()
+        self.assertEqual(tbl.layout(terminal, 80).column_widths(),
+                         (12, 15, 18))
+        tbl.set_column(0, minimum=20)
+        tbl.set_column(2, maximum=10)
+        self.assertEqual(tbl.layout(terminal, 80).column_widths(),
+                         (20, 15, 10))
+        tbl.set_column(0, weight=2)
+        tbl.set_column(2)
+        self.assertEqual(tbl.layout(terminal, 30).column_widths(),
+                         (12, 9, 9))
+
+
+class ColumnWidthsTest(TestCase):
+    def setUp(self):
+        self._rows = [[(i * 7 + j * 3) % 11 + j for j in range(4)]
+                      for i in range(101)]
+        self._rows.append([70000])
+        self._rows.append([])
+
+    def _widths(self):
+        widths = ColumnWidths(4)
+        for row in self._rows:
+            widths.add_row(row)
+        return widths
+
+    def _expected(self):
+        return [max(x[i] if i < len(x) else 0 for x in self._rows)
+                for i in range(4)]
+
+    def test_maximum(self):
+        widths = self._widths()
+        self.assertEqual(widths.rows(), len(self._rows))
+        self.assertEqual(widths.column(1).typecode, 'H')
+        self.assertEqual(widths.column(0).typecode, 'L')
+        self.assertEqual(widths.maximum(), self._expected())
+
+        for index in (101, 3, 50):
+            self._rows[index] = [2, 20]
+            widths.set_row(index, self._rows[index])
+            self.assertEqual(widths.maximum(), self._expected())